@@ -0,0 +1,216 @@
+import argparse, json, os, platform, subprocess, sys, tempfile, time
+
+import numpy as np
+
+from game.backends import CPU_BACKENDS
+from game.file_support import load_file, save_file
+
+# Simulation throughput, file format speed, file manager scans and cold start, written as JSON so runs
+# from different commits can be compared.
+# python benchmark.py --output before.json
+
+SIZES = [(160, 90), (640, 360), (1920, 1080)]
+DENSITIES = [0.1, 0.5]
+FORMATS = {"rle": ".rle", "life_5": ".lif", "life_6": ".06.lif", "snapshot": ".snap", "compressed snapshot": ".snap", "macrocell": ".mc"}
+
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+
+import pyglet
+pyglet.options['shadow_window'] = False
+import arcade
+
+from menus.main import Main
+
+window = arcade.Window(visible=False)
+window.show_view(Main())
+window.dispatch_events()
+window.on_draw()
+window.flip()
+
+print(time.perf_counter() - start)
+"""
+
+def timed(function, min_time=0.5):
+    # Seconds per call, calling function until min_time has passed.
+    calls, start = 0, time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / calls
+
+def random_board(size, density, seed=0):
+    cols, rows = size
+    return (np.random.default_rng(seed).random((rows, cols)) < density).astype(np.uint8)
+
+def bench_engines(sizes, densities, min_time):
+    results = []
+    for backend, engine_class in CPU_BACKENDS.items():
+        for size in sizes:
+            for density in densities:
+                board = random_board(size, density)
+                engine = engine_class(board.shape[0], board.shape[1], board)
+                engine.step() # warm up caches and the first allocation
+
+                seconds = timed(engine.step, min_time)
+                results.append({"backend": backend, "size": f"{size[0]}x{size[1]}", "density": density, "generations_per_second": 1 / seconds})
+                print(f"{backend:>15} {size[0]}x{size[1]} {density:.0%}: {1 / seconds:.1f} gen/s", file=sys.stderr)
+
+    return results
+
+def bench_gpu(sizes, densities, min_time, workgroup_size=(16, 16)):
+    # Same boards on the compute shaders, needs a GL 4.3 context.
+    from pyglet.gl import glFinish
+    from game.bitpacked import pack, word_count
+    from game.game_of_life import create_shader, create_packed_shader, create_stats_buffer, create_rule_buffer, dispatch_groups, dispatch_generations
+    from game.active_tiles import ActiveTiles
+    from game.rules import LIFE
+
+    results = []
+    for backend in ("GPU", "GPU Active Tiles", "GPU Bit-Packed"):
+        for size in sizes:
+            for density in densities:
+                board = random_board(size, density)
+                rows, cols = board.shape
+
+                tiles = None
+                if backend != "GPU Bit-Packed":
+                    grid = board.astype(np.int32).ravel()
+                    shader_program, _, ssbo_in, ssbo_out = create_shader(grid, rows, cols, workgroup_size, backend == "GPU Active Tiles")
+                    ssbo_in.set_data(grid.tobytes())
+                    if backend == "GPU Active Tiles":
+                        tiles = ActiveTiles(rows, cols, workgroup_size)
+                else:
+                    words = pack(board, 32)
+                    shader_program, _, ssbo_in, ssbo_out = create_packed_shader(words, rows, cols)
+                    ssbo_in.set_data(words.tobytes())
+                stats_buffer, rule_buffer = create_stats_buffer(), create_rule_buffer(LIFE)
+                groups = dispatch_groups(rows, cols, workgroup_size, backend == "GPU Bit-Packed")
+
+                buffers = [ssbo_in, ssbo_out]
+                def step(generations=32):
+                    with shader_program:
+                        shader_program['rows'], shader_program['cols'], shader_program['running'] = rows, cols, True
+                        if backend == "GPU Bit-Packed":
+                            shader_program['words'] = word_count(cols, 32)
+                        else:
+                            shader_program['states'] = LIFE.states
+                        if tiles is not None:
+                            buffers[:] = tiles.dispatch_generations(shader_program, *buffers, generations)
+                        else:
+                            buffers[:] = dispatch_generations(shader_program, *buffers, groups, generations)
+                    glFinish()
+
+                step()
+                seconds = timed(step, min_time) / 32
+                results.append({"backend": backend, "size": f"{size[0]}x{size[1]}", "density": density, "generations_per_second": 1 / seconds})
+                print(f"{backend:>15} {size[0]}x{size[1]} {density:.0%}: {1 / seconds:.1f} gen/s", file=sys.stderr)
+
+                for buffer in (*buffers, stats_buffer, rule_buffer):
+                    buffer.delete()
+                if tiles is not None:
+                    tiles.delete()
+
+    return results
+
+def bench_formats(size, density, min_time):
+    board = random_board(size, density)
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        for file_type, extension in FORMATS.items():
+            file_path = os.path.join(directory, f"board{extension}")
+            options = {"compress": True} if file_type == "compressed snapshot" else {}
+            save_type = "snapshot" if file_type == "compressed snapshot" else file_type
+
+            encode = timed(lambda: save_file(board, file_path, save_type, **options), min_time)
+            decode = timed(lambda: load_file(0, 0, file_path), min_time)
+
+            file_size = os.path.getsize(file_path)
+            results.append({"format": file_type, "size": f"{size[0]}x{size[1]}", "density": density, "bytes": file_size, "encode_seconds": encode, "decode_seconds": decode})
+            print(f"{file_type:>20}: encode {encode * 1000:.1f} ms, decode {decode * 1000:.1f} ms, {file_size} bytes", file=sys.stderr)
+
+    return results
+
+def bench_file_manager(directory):
+    # Cold scan of directory two levels deep, the way the file manager opens. Needs a window.
+    from game.file_manager import FileManager
+
+    start = time.perf_counter()
+    file_manager = FileManager(directory, [".txt", ".rle", ".mc", ".snap"])
+    elapsed = time.perf_counter() - start
+
+    return {"directory": directory, "directories": len(file_manager.content_cache), "scan_seconds": elapsed}
+
+def bench_startup(runs):
+    # Fresh interpreter to the first drawn Main view, both including and excluding interpreter start.
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        elapsed = time.perf_counter() - start
+        if process.returncode:
+            return {"skipped": process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "startup failed"}
+
+        results.append((elapsed, float(process.stdout.strip().splitlines()[-1])))
+
+    return {"runs": runs, "process_seconds": min(total for total, _ in results), "to_main_view_seconds": min(view for _, view in results)}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the simulation backends, file formats and startup.")
+    parser.add_argument("--output", help="JSON file for the results, printed to stdout otherwise")
+    parser.add_argument("--quick", action="store_true", help="smallest grid size only and shorter timings")
+    parser.add_argument("--no-gl", action="store_true", help="skip everything that needs a window")
+    parser.add_argument("--format-size", default="1024x1024")
+    parser.add_argument("--directory", default=os.path.expanduser("~"), help="directory for the file manager scan")
+    args = parser.parse_args()
+
+    sizes = SIZES[:1] if args.quick else SIZES
+    min_time = 0.1 if args.quick else 0.5
+
+    report = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "engines": bench_engines(sizes, DENSITIES, min_time),
+        "formats": bench_formats(tuple(map(int, args.format_size.split("x"))), 0.3, min_time),
+    }
+
+    if args.no_gl:
+        report["gpu"] = report["file_manager"] = report["startup"] = {"skipped": "--no-gl"}
+    else:
+        try:
+            import arcade
+            window = arcade.Window(visible=False)
+        except Exception as e: # no display or no GL driver, the CPU numbers are still worth keeping
+            report["gpu"] = report["file_manager"] = report["startup"] = {"skipped": f"no window: {e}"}
+        else:
+            try:
+                report["gpu"] = bench_gpu(sizes, DENSITIES, min_time)
+            except Exception as e: # GL context without compute shaders
+                report["gpu"] = {"skipped": str(e)}
+
+            report["file_manager"] = bench_file_manager(args.directory)
+            window.close()
+            report["startup"] = bench_startup(1 if args.quick else 3)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import struct
+
+import numpy as np
+import pyglet
+
+from pyglet.gl import glBindBuffer, glBindBufferBase, glDispatchComputeIndirect, glMemoryBarrier, GL_SHADER_STORAGE_BUFFER, GL_DISPATCH_INDIRECT_BUFFER, GL_ALL_BARRIER_BITS
+
+from game.game_of_life import ACTIVE_TILES_SOURCE, get_shader_program
+
+# Only tiles that changed in the last generation, or touch one that did, can change in the next one, every other
+# tile is skipped: its cells stay in both grid buffers and its texels stay in the image. Before every pass the
+# activate pass walks the tile flags and compacts the active tiles into a list, the tiled shader is dispatched
+# over that list with glDispatchComputeIndirect, so the cell work follows the activity instead of the board area.
+# Stats are kept per tile and added up by the reduce pass after the last pass of a tick.
+def get_activate_shader_source(tile_rows, tile_cols):
+    return f"""#version 430 core
+{ACTIVE_TILES_SOURCE}
+uniform bool running;
+uniform bool render;
+
+layout (local_size_x = 64, local_size_y = 1, local_size_z = 1) in;
+
+void main() {{
+    int tile = int(gl_GlobalInvocationID.x);
+    if (tile >= {tile_rows * tile_cols}) {{
+        return;
+    }}
+
+    int tile_row = tile / {tile_cols};
+    int tile_col = tile % {tile_cols};
+
+    // tiles that are only behind on their texels and stats are caught up on render passes
+    bool active = render && (tile_flags[tile] & 4u) != 0u;
+    for (int row = max(tile_row - 1, 0); row <= min(tile_row + 1, {tile_rows - 1}); row++) {{
+        for (int col = max(tile_col - 1, 0); col <= min(tile_col + 1, {tile_cols - 1}); col++) {{
+            if ((tile_flags[row * {tile_cols} + col] & (1u << uint(parity))) != 0u) {{
+                active = true;
+            }}
+        }}
+    }}
+
+    // Paused passes don't change anything, so the flags of the last step stay until the board runs again.
+    if (running) {{
+        atomicAnd(tile_flags[tile], ~(1u << uint(1 - parity)));
+    }}
+
+    if (active) {{
+        active_tiles[atomicAdd(active_groups[0], 1u)] = uint(tile);
+    }}
+}}
+"""
+
+def get_reduce_shader_source(tile_rows, tile_cols):
+    return f"""#version 430 core
+{ACTIVE_TILES_SOURCE}
+layout(std430, binding = 5) buffer Stats {{
+    uint population;
+    int min_row;
+    int min_col;
+    int max_row;
+    int max_col;
+    uint hash_low;
+    uint hash_high;
+    uint generation_low;
+    uint generation_high;
+}};
+
+layout (local_size_x = 64, local_size_y = 1, local_size_z = 1) in;
+
+void main() {{
+    uint tile = gl_GlobalInvocationID.x;
+    if (tile >= {tile_rows * tile_cols}u) {{
+        return;
+    }}
+
+    uint base = tile * 7u;
+    if (tile_stats[base] > 0u) {{
+        atomicAdd(population, tile_stats[base]);
+        atomicMin(min_row, int(tile_stats[base + 1u]));
+        atomicMin(min_col, int(tile_stats[base + 2u]));
+        atomicMax(max_row, int(tile_stats[base + 3u]));
+        atomicMax(max_col, int(tile_stats[base + 4u]));
+    }}
+    if ((tile_stats[base + 5u] | tile_stats[base + 6u]) != 0u) {{
+        atomicAdd(hash_low, tile_stats[base + 5u]);
+        atomicAdd(hash_high, tile_stats[base + 6u]);
+    }}
+}}
+"""
+
+class ActiveTiles:
+    def __init__(self, rows, cols, workgroup_size):
+        self.tile_size = workgroup_size
+        self.tile_rows = (rows + workgroup_size[1] - 1) // workgroup_size[1]
+        self.tile_cols = (cols + workgroup_size[0] - 1) // workgroup_size[0]
+        tiles = self.tile_rows * self.tile_cols
+
+        self.activate_program = get_shader_program(get_activate_shader_source, self.tile_rows, self.tile_cols)
+        self.reduce_program = get_shader_program(get_reduce_shader_source, self.tile_rows, self.tile_cols)
+
+        self.flags_buffer = pyglet.graphics.BufferObject(tiles * 4, usage=pyglet.gl.GL_DYNAMIC_COPY)
+        self.list_buffer = pyglet.graphics.BufferObject((3 + tiles) * 4, usage=pyglet.gl.GL_DYNAMIC_COPY)
+        self.stats_buffer = pyglet.graphics.BufferObject(tiles * 7 * 4, usage=pyglet.gl.GL_DYNAMIC_COPY)
+        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 8, self.flags_buffer.id)
+        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 9, self.list_buffer.id)
+        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 10, self.stats_buffer.id)
+
+        self.parity = 0
+        self.reset()
+
+    def reset(self):
+        # After the grid buffer was written from the CPU every tile is stepped and drawn again.
+        self.flags_buffer.set_data(np.full(self.tile_rows * self.tile_cols, 7, dtype=np.uint32).tobytes())
+
+    def dispatch_generations(self, shader_program, ssbo_in, ssbo_out, generations, running=True):
+        # Same as dispatch_generations in game/game_of_life.py, plus the activate pass before every pass and
+        # the reduce pass after the last one. The shader program has to be in use.
+        groups = (self.tile_rows * self.tile_cols + 63) // 64
+        reset_list = struct.pack("<III", 0, 1, 1)
+
+        for generation in range(generations):
+            render = generation == generations - 1
+
+            self.list_buffer.set_data_region(reset_list, 0, len(reset_list))
+            with self.activate_program:
+                self.activate_program['parity'] = self.parity
+                self.activate_program['running'] = running
+                self.activate_program['render'] = render
+                self.activate_program.dispatch(groups, 1, 1, barrier=GL_ALL_BARRIER_BITS)
+
+            shader_program.use()
+            shader_program['render'] = render
+            shader_program['parity'] = self.parity
+            glBindBuffer(GL_DISPATCH_INDIRECT_BUFFER, self.list_buffer.id)
+            glDispatchComputeIndirect(0)
+            glMemoryBarrier(GL_ALL_BARRIER_BITS)
+
+            if running:
+                self.parity = 1 - self.parity
+
+            ssbo_in, ssbo_out = ssbo_out, ssbo_in
+            glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 3, ssbo_in.id)
+            glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 4, ssbo_out.id)
+
+        with self.reduce_program:
+            self.reduce_program.dispatch(groups, 1, 1, barrier=GL_ALL_BARRIER_BITS)
+        shader_program.use()
+
+        return ssbo_in, ssbo_out
+
+    def delete(self):
+        self.flags_buffer.delete()
+        self.list_buffer.delete()
+        self.stats_buffer.delete()
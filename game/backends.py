@@ -0,0 +1,19 @@
+from game.cpu_engine import NumpyEngine
+from game.bitpacked import BitPackedEngine
+from game.hashlife import HashLifeEngine
+from game.sparse_engine import SparseEngine
+from game.threaded_engine import ThreadedEngine
+
+# Backends that simulate on the CPU and upload the result into the texture, "GPU" uses the compute shader.
+CPU_BACKENDS = {"CPU": NumpyEngine, "CPU Threaded": ThreadedEngine, "CPU Bit-Packed": BitPackedEngine, "HashLife": HashLifeEngine, "Sparse": SparseEngine}
+# Backends on an unbounded plane, the board only shows the window at (view_row, view_col).
+UNBOUNDED_BACKENDS = ["HashLife", "Sparse"]
+
+def backend_for_rule(backend, rule):
+    # The bit-packed adders only count neighbours, and the unbounded planes only hold live cells and can't
+    # have cells born with no live neighbours. Rules they can't run go to the plain backend on the same device.
+    if backend in ("CPU Bit-Packed", "GPU Bit-Packed") and (rule.states > 2 or not rule.totalistic):
+        return backend.replace(" Bit-Packed", "")
+    if backend in UNBOUNDED_BACKENDS and (rule.states > 2 or rule.births_from_nothing):
+        return "CPU"
+    return backend
@@ -0,0 +1,194 @@
+import numpy as np
+
+from array import array
+
+from game.cpu_engine import cells_to_rgba
+from game.rules import LIFE
+
+# Bit c % 64 of word c // 64 holds column c. On little-endian machines a row of uint64 words
+# viewed as uint32 keeps the same bit order, which is the layout the packed shader reads.
+WORD_BITS = 64
+
+def word_count(cols, word_bits=WORD_BITS):
+    return (cols + word_bits - 1) // word_bits
+
+def pack(cells, word_bits=WORD_BITS):
+    rows, cols = cells.shape
+    words = word_count(cols, word_bits)
+
+    padded = np.zeros((rows, words * word_bits), dtype=np.uint8)
+    padded[:, :cols] = cells != 0
+
+    return np.packbits(padded, axis=1, bitorder="little").view(f"<u{word_bits // 8}")
+
+def unpack(words, cols):
+    return np.unpackbits(np.ascontiguousarray(words).view(np.uint8), axis=1, bitorder="little", count=cols)
+
+def pack_positions(positions, rows, cols, word_bits=WORD_BITS):
+    words = np.zeros((rows, word_count(cols, word_bits)), dtype=f"<u{word_bits // 8}")
+
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+    if not len(positions):
+        return words
+
+    row, col = positions[:, 0], positions[:, 1]
+    inside = (row >= 0) & (row < rows) & (col >= 0) & (col < cols)
+    row, col = row[inside], col[inside]
+
+    bits = np.left_shift(np.ones(len(col), dtype=words.dtype), (col % word_bits).astype(words.dtype))
+    np.bitwise_or.at(words, (row, col // word_bits), bits)
+
+    return words
+
+def place_words(words, rows, cols, top, left, word_bits=WORD_BITS):
+    # Packed rows (any word size, same bit order) placed on a rows x cols board with their cell (0, 0) at (top, left),
+    # shifting whole words and bits instead of going through cell positions. Whatever falls off the board is cropped.
+    dtype = np.dtype(f"<u{word_bits // 8}")
+    board = np.zeros((rows, word_count(cols, word_bits)), dtype=dtype)
+
+    source = np.ascontiguousarray(words).view(dtype)
+    band = source[max(0, -top):max(0, rows - top)]
+    if not band.size:
+        return board
+
+    # Board word j takes the top bits of source word j - q - 1 and the bottom ones of source word j - q.
+    q, r = divmod(left, word_bits)
+    padded = np.zeros((len(band), band.shape[1] + 2), dtype=dtype)
+    padded[:, 1:-1] = band
+
+    first, last = max(0, q), min(board.shape[1], q + band.shape[1] + 1)
+    if first < last:
+        placed = padded[:, first - q + 1:last - q + 1] << dtype.type(r)
+        if r:
+            placed |= padded[:, first - q:last - q] >> dtype.type(word_bits - r)
+        board[max(0, top):max(0, top) + len(band), first:last] = placed
+
+    if cols % word_bits: # bits past the last column stay clear
+        board[:, -1] &= dtype.type((1 << int(cols % word_bits)) - 1)
+
+    return board
+
+def edit_masks(rows, cols, values, grid_cols, word_bits=WORD_BITS):
+    # Cell edits as (flat word index, bits to set, bits to clear), one entry per touched word.
+    dtype = np.dtype(f"<u{word_bits // 8}")
+    words = rows * word_count(grid_cols, word_bits) + cols // word_bits
+    bits = np.left_shift(np.ones(len(cols), dtype=dtype), (cols % word_bits).astype(dtype))
+
+    unique_words, inverse = np.unique(words, return_inverse=True)
+    set_masks = np.zeros(len(unique_words), dtype=dtype)
+    clear_masks = np.zeros(len(unique_words), dtype=dtype)
+
+    alive = values != 0
+    np.bitwise_or.at(set_masks, inverse[alive], bits[alive])
+    np.bitwise_or.at(clear_masks, inverse[~alive], bits[~alive])
+
+    return unique_words, set_masks, clear_masks
+
+def count_planes(top_sum, top_carry, bottom_sum, bottom_carry, middle_sum, middle_carry):
+    # Bit-sliced neighbour count 0-8 as (ones, twos, fours, eights) from the row adders.
+    ones = top_sum ^ bottom_sum ^ middle_sum
+    ones_carry = (top_sum & bottom_sum) | (middle_sum & (top_sum ^ bottom_sum))
+
+    # top, bottom and middle carries and the ones carry all weigh two
+    low_sum, low_carry = top_carry ^ bottom_carry, top_carry & bottom_carry
+    high_sum, high_carry = middle_carry ^ ones_carry, middle_carry & ones_carry
+    twos, twos_carry = low_sum ^ high_sum, low_sum & high_sum
+
+    fours = low_carry ^ high_carry ^ twos_carry
+    eights = (low_carry & high_carry) | (twos_carry & (low_carry ^ high_carry))
+
+    return ones, twos, fours, eights
+
+class BitPackedEngine:
+    # Two state totalistic rules only, the adders count neighbours without knowing where they are.
+    def __init__(self, rows, cols, grid=None, rule=LIFE):
+        self.rows = rows
+        self.cols = cols
+        self.rule = rule
+        self.terms = rule.count_terms()
+        self.words = word_count(cols)
+
+        # One dead row above and below, the shifts below supply the dead columns.
+        self.padded = np.zeros((rows + 2, self.words), dtype=np.uint64)
+        self.cells = self.padded[1:-1]
+
+        self.mask = np.full(self.words, np.uint64(0xFFFFFFFFFFFFFFFF), dtype=np.uint64)
+        if cols % WORD_BITS:
+            self.mask[-1] = np.uint64((1 << (cols % WORD_BITS)) - 1)
+
+        if grid is not None:
+            self.load(grid)
+
+    def load(self, grid):
+        self.cells[:] = pack(np.asarray(grid).reshape(self.rows, self.cols))
+
+    def load_packed(self, words):
+        self.cells[:] = words
+
+    def set_cell(self, row, col, value):
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return
+
+        bit = np.uint64(1 << (col % WORD_BITS))
+        if value:
+            self.cells[row, col // WORD_BITS] |= bit
+        else:
+            self.cells[row, col // WORD_BITS] &= ~bit
+
+    def set_cells(self, rows, cols, values):
+        words, set_masks, clear_masks = edit_masks(rows, cols, values, self.cols)
+        flat = self.cells.reshape(-1)
+        flat[words] = (flat[words] & ~clear_masks) | set_masks
+
+    def step(self, generations=1):
+        one, carry_shift = np.uint64(1), np.uint64(WORD_BITS - 1)
+        padded = self.padded
+
+        for _ in range(generations):
+            # Neighbour to the west/east of every cell, carrying bits across word boundaries.
+            west = padded << one
+            west[:, 1:] |= padded[:, :-1] >> carry_shift
+            east = padded >> one
+            east[:, :-1] |= padded[:, 1:] << carry_shift
+
+            # Full adder over each row's west, centre and east cells.
+            row_sum = west ^ padded ^ east
+            row_carry = (west & padded) | (east & (west ^ padded))
+
+            top_sum, top_carry = row_sum[:-2], row_carry[:-2]
+            bottom_sum, bottom_carry = row_sum[2:], row_carry[2:]
+            middle_sum = (west ^ east)[1:-1]
+            middle_carry = (west & east)[1:-1]
+
+            planes = count_planes(top_sum, top_carry, bottom_sum, bottom_carry, middle_sum, middle_carry)
+            inverted = [~plane for plane in planes]
+
+            # B3/S23 is "count == 3, or count == 2 and alive", every count the rule keeps alive is one such term
+            alive, next_cells = self.cells, np.zeros_like(self.cells)
+            for count, born, survives in self.terms:
+                match = planes[0] if count & 1 else inverted[0]
+                for bit in range(1, 4):
+                    match = match & (planes[bit] if count >> bit & 1 else inverted[bit])
+
+                if not born:
+                    match &= alive
+                elif not survives:
+                    match &= ~alive
+                next_cells |= match
+
+            self.cells[:] = next_cells & self.mask
+
+    def population(self):
+        return int(np.bitwise_count(self.cells).sum())
+
+    def state_key(self):
+        return hash(self.cells.tobytes())
+
+    def to_cells(self):
+        return unpack(self.cells, self.cols)
+
+    def to_array(self):
+        return array('i', self.to_cells().astype(np.int32).tobytes())
+
+    def to_rgba(self):
+        return cells_to_rgba(self.to_cells())
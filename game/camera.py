@@ -0,0 +1,181 @@
+import math
+
+import numpy as np
+import pyglet
+
+from pyglet.gl import GL_READ_ONLY, GL_WRITE_ONLY, GL_ALL_BARRIER_BITS
+
+from game.cpu_engine import ALIVE_COLOR, DEAD_COLOR
+from game.game_of_life import create_texture
+
+MAX_ZOOM = 64 # screen pixels per cell
+
+# Every level halves the board, a texel holds the share of live cells below it in alpha and its color in rgb.
+# Level 1 is built from the board image (dying states count partially), the others from the level below.
+DENSITY_SHADER_SOURCE = """#version 430 core
+
+layout (local_size_x = 8, local_size_y = 8, local_size_z = 1) in;
+layout(binding = 1, rgba32f) readonly uniform image2D source;
+layout(binding = 2, rgba32f) writeonly uniform image2D target;
+
+uniform bool from_board;
+uniform ivec2 origin;
+
+void main() {
+    ivec2 texel = origin + ivec2(gl_GlobalInvocationID.xy);
+    if (texel.x >= imageSize(target).x || texel.y >= imageSize(target).y) {
+        return;
+    }
+
+    ivec2 source_size = imageSize(source);
+    float density = 0.0;
+    for (int y = 0; y < 2; y++) {
+        for (int x = 0; x < 2; x++) {
+            ivec2 below = texel * 2 + ivec2(x, y);
+            if (below.x < source_size.x && below.y < source_size.y) {
+                vec4 value = imageLoad(source, below);
+                density += from_board ? clamp((value.r - 0.19) / 0.81, 0.0, 1.0) : value.a;
+            }
+        }
+    }
+    density /= 4.0;
+
+    // sqrt so a handful of cells in a big block still shows up
+    imageStore(target, texel, vec4(mix(vec3(0.19, 0.31, 0.31), vec3(1.0, 1.0, 1.0), sqrt(density)), density));
+}
+"""
+
+density_program = None
+
+def get_density_program():
+    global density_program
+    if density_program is None:
+        density_program = pyglet.graphics.shader.ComputeShaderProgram(DENSITY_SHADER_SOURCE)
+    return density_program
+
+class Camera:
+    # Maps between board cells and window pixels. The board fills the viewport at the start, zooming in
+    # and panning only ever shows the cells inside it. Row 0 is the bottom row, like in the texture.
+    def __init__(self, rows, cols, max_width, max_height, center_x, center_y):
+        self.rows, self.cols = rows, cols
+
+        self.fit_zoom = min(max_width / cols, max_height / rows)
+        self.width, self.height = cols * self.fit_zoom, rows * self.fit_zoom
+        self.x, self.y = center_x - self.width / 2, center_y - self.height / 2
+
+        self.fit()
+
+    def fit(self):
+        self.zoom = self.fit_zoom
+        self.center_row, self.center_col = self.rows / 2, self.cols / 2
+
+    def screen_to_cell(self, x, y):
+        # (row, col) as floats, the cell is their floor
+        return (self.center_row + (y - self.y - self.height / 2) / self.zoom,
+                self.center_col + (x - self.x - self.width / 2) / self.zoom)
+
+    def cell_to_screen(self, row, col):
+        return (self.x + self.width / 2 + (col - self.center_col) * self.zoom,
+                self.y + self.height / 2 + (row - self.center_row) * self.zoom)
+
+    def inside(self, x, y):
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    def zoom_at(self, factor, x, y):
+        # The cell under (x, y) stays under it.
+        row, col = self.screen_to_cell(x, y)
+        self.zoom = max(self.fit_zoom, min(MAX_ZOOM, self.zoom * factor))
+        self.center_row = row - (y - self.y - self.height / 2) / self.zoom
+        self.center_col = col - (x - self.x - self.width / 2) / self.zoom
+        self.clamp()
+
+    def pan(self, dx, dy):
+        self.center_col -= dx / self.zoom
+        self.center_row -= dy / self.zoom
+        self.clamp()
+
+    def clamp(self):
+        # The viewport never leaves the board.
+        half_rows, half_cols = self.height / 2 / self.zoom, self.width / 2 / self.zoom
+        self.center_row = min(max(self.center_row, half_rows), self.rows - half_rows)
+        self.center_col = min(max(self.center_col, half_cols), self.cols - half_cols)
+
+    def visible(self):
+        # (first row, first col, end row, end col) of the cells at least partly in the viewport
+        bottom, left = self.screen_to_cell(self.x, self.y)
+        top, right = self.screen_to_cell(self.x + self.width, self.y + self.height)
+        return max(0, math.floor(bottom)), max(0, math.floor(left)), min(self.rows, math.ceil(top)), min(self.cols, math.ceil(right))
+
+    def level(self, levels):
+        # Density level with about one texel per pixel, 0 is the board itself.
+        if self.zoom >= 1:
+            return 0
+        return min(levels, int(math.log2(1 / self.zoom)))
+
+class DensityPyramid:
+    # Halved density images of the board for drawing it zoomed out, where sampling single cells would
+    # drop most of them. Only the part in view is rebuilt, and only after the board or the view changed.
+    def __init__(self, rows, cols):
+        self.rows, self.cols = rows, cols
+        self.levels = max(0, math.ceil(math.log2(max(rows, cols))) - 1)
+        self.textures = {}
+        self.stale = True # the board changed since the last build
+        self.built = None # (level, visible cells) of the last build
+
+    def needs_build(self, level, visible):
+        return self.stale or self.built != (level, visible)
+
+    def texture(self, level):
+        if level not in self.textures:
+            scale = 1 << level
+            self.textures[level] = create_texture((self.rows + scale - 1) // scale, (self.cols + scale - 1) // scale)
+        return self.textures[level]
+
+    def level_rects(self, level, visible):
+        # Texels to build on every level up to level, each covering what the level above reads.
+        row0, col0, row1, col1 = visible
+        scale = 1 << level
+        rects = {level: (row0 // scale, col0 // scale, -(-row1 // scale), -(-col1 // scale))}
+        for below in range(level - 1, 0, -1):
+            row0, col0, row1, col1 = rects[below + 1]
+            texture = self.texture(below)
+            rects[below] = (row0 * 2, col0 * 2, min(texture.height, row1 * 2), min(texture.width, col1 * 2))
+        return rects
+
+    def build(self, board_image, level, visible):
+        program = get_density_program()
+        rects = self.level_rects(level, visible)
+
+        with program:
+            for current in range(1, level + 1):
+                row0, col0, row1, col1 = rects[current]
+                source = board_image if current == 1 else self.texture(current - 1)
+                source.bind_image_texture(unit=1, access=GL_READ_ONLY)
+                self.texture(current).bind_image_texture(unit=2, access=GL_WRITE_ONLY)
+
+                program['from_board'] = current == 1
+                program['origin'] = (col0, row0)
+                program.dispatch((col1 - col0 + 7) // 8, (row1 - row0 + 7) // 8, 1, barrier=GL_ALL_BARRIER_BITS)
+
+        self.stale = False
+        self.built = (level, visible)
+
+    def build_from_cells(self, cells, level, visible):
+        # Same on the CPU for the CPU backends, straight from the engine's cells to the one level drawn.
+        scale = 1 << level
+        texture = self.texture(level)
+        padded = np.zeros((texture.height * scale, texture.width * scale), dtype=np.float32)
+        padded[:self.rows, :self.cols] = cells == 1
+        density = padded.reshape(texture.height, scale, texture.width, scale).mean(axis=(1, 3))
+
+        colors = np.array(DEAD_COLOR) + (np.array(ALIVE_COLOR) - np.array(DEAD_COLOR)) * np.sqrt(density)[..., None]
+        image_data = pyglet.image.ImageData(texture.width, texture.height, "RGBA", colors.astype(np.uint8).tobytes())
+        texture.blit_into(image_data, 0, 0, 0)
+
+        self.stale = False
+        self.built = (level, visible)
+
+    def delete(self):
+        for texture in self.textures.values():
+            texture.delete()
+        self.textures = {}
@@ -0,0 +1,109 @@
+import numpy as np
+
+from array import array
+
+from game.rules import LIFE, NEIGHBOR_OFFSETS
+
+# Same colors as the compute shader output, kept here so the CPU engines don't need arcade.
+ALIVE_COLOR = (255, 255, 255, 255)
+DEAD_COLOR = (48, 79, 79, 255)
+
+def state_palette(states=2):
+    # Dead, alive, then the dying states of Generations rules fading from alive to dead.
+    fade = 0.6 * (1 - (np.arange(2, states)[:, None] - 1) / (states - 1))
+    dying = np.array(DEAD_COLOR) + (np.array(ALIVE_COLOR) - np.array(DEAD_COLOR)) * fade
+    return np.vstack([DEAD_COLOR, ALIVE_COLOR, dying]).astype(np.uint8)
+
+def cells_to_rgba(cells, states=2):
+    # cells is a (rows, cols) array of states, row 0 is the bottom row of the texture like in the shader
+    return state_palette(states)[cells].tobytes()
+
+def count_next(offsets, alive, terms, neighbors, scratch, out):
+    # offsets are (view, bit) pairs of the padded alive array shifted onto each neighbour
+    np.add(offsets[0][0], offsets[1][0], out=neighbors)
+    for neighbor, _ in offsets[2:]:
+        neighbors += neighbor
+
+    # B3/S23 is "3 neighbours, or 2 neighbours and alive now", every count the rule keeps alive is one such term
+    out[:] = False
+    for count, born, survives in terms:
+        np.equal(neighbors, count, out=scratch)
+        if not born:
+            scratch &= alive
+        elif not survives:
+            scratch &= ~alive
+        out |= scratch
+
+def table_next(offsets, cells, table, index, shifted, out):
+    # The state in the high byte, a bit per live neighbour in the low one.
+    np.left_shift(cells, 8, out=index, dtype=np.uint16)
+    for neighbor, bit in offsets:
+        np.left_shift(neighbor, bit, out=shifted)
+        index |= shifted
+
+    np.take(table, index, out=out)
+
+class NumpyEngine:
+    def __init__(self, rows, cols, grid=None, rule=LIFE):
+        self.rows = rows
+        self.cols = cols
+        self.rule = rule
+
+        self.cells = np.zeros((rows, cols), dtype=np.uint8)
+
+        # Two state totalistic rules only need the neighbour count, anything else looks up the whole neighbourhood.
+        self.terms = rule.count_terms() if rule.states == 2 and rule.totalistic else None
+        dtype = np.uint8 if self.terms is not None else np.uint16
+
+        # Scratch buffers are allocated once, every step works in-place on them.
+        self.padded = np.zeros((rows + 2, cols + 2), dtype=dtype) # 1 cell dead border, same as the shader's bounds check
+        self.neighbors = np.zeros((rows, cols), dtype=dtype)
+        self.shifted = np.zeros((rows, cols), dtype=dtype)
+        self.scratch = np.zeros((rows, cols), dtype=np.bool_)
+        self.next = np.zeros((rows, cols), dtype=np.bool_)
+        self.offsets = [(self.padded[1 + dy:rows + 1 + dy, 1 + dx:cols + 1 + dx], bit) for bit, (dy, dx) in enumerate(NEIGHBOR_OFFSETS)]
+
+        if grid is not None:
+            self.load(grid)
+
+    def load(self, grid):
+        self.cells[:] = np.asarray(grid).reshape(self.rows, self.cols) # states, so rewinding keeps dying cells
+
+    def set_cell(self, row, col, value):
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            self.cells[row, col] = 1 if value else 0
+
+    def set_cells(self, rows, cols, values):
+        self.cells[rows, cols] = values != 0
+
+    def step(self, generations=1):
+        interior = self.padded[1:-1, 1:-1]
+
+        for _ in range(generations):
+            np.equal(self.cells, 1, out=interior)
+            if self.terms is not None:
+                self.count_step()
+            else:
+                self.table_step()
+
+    def count_step(self):
+        count_next(self.offsets, self.cells.view(np.bool_), self.terms, self.neighbors, self.scratch, self.next)
+        self.cells[:] = self.next
+
+    def table_step(self):
+        table_next(self.offsets, self.cells, self.rule.table, self.neighbors, self.shifted, self.cells)
+
+    def population(self):
+        return int(np.count_nonzero(self.cells == 1))
+
+    def state_key(self):
+        return hash(self.cells.tobytes())
+
+    def to_cells(self):
+        return self.cells
+
+    def to_array(self):
+        return array('i', self.cells.astype(np.int32).tobytes())
+
+    def to_rgba(self):
+        return cells_to_rgba(self.cells, self.rule.states)
@@ -0,0 +1,67 @@
+from collections import deque
+from math import gcd
+
+# Boards are remembered by a state key (a hash of the cells) for the last CYCLE_HISTORY samples.
+# Once a key comes back the board is periodic, from then on the state at any later generation is known
+# without computing it, so stepping can be skipped or cut down to the remainder of the period.
+CYCLE_HISTORY = 4096
+
+class CycleDetector:
+    def __init__(self, history=CYCLE_HISTORY):
+        self.samples = deque(maxlen=history) # (generation, key), oldest first
+        self.generations = {} # key -> newest generation it was seen at
+        self.keys = {} # generation -> key
+        self.period = None
+        self.start = None
+        self.since = -1
+
+    def reset(self, generation=-1):
+        # Forget everything, samples from generation and before are ignored from now on (stale GPU readbacks).
+        self.samples.clear()
+        self.generations.clear()
+        self.keys.clear()
+        self.period = None
+        self.start = None
+        self.since = generation
+
+    def observe(self, generation, key):
+        # True when the sample found a cycle or a shorter period for the one already found.
+        # Samples don't have to be consecutive, with gaps the period is the gcd of every repeat seen.
+        if generation <= self.since or generation in self.keys:
+            return False
+
+        if len(self.samples) == self.samples.maxlen:
+            old_generation, old_key = self.samples[0]
+            if self.generations.get(old_key) == old_generation:
+                del self.generations[old_key]
+            del self.keys[old_generation]
+
+        earlier = self.generations.get(key)
+        self.samples.append((generation, key))
+        self.generations[key] = generation
+        self.keys[generation] = key
+
+        if earlier is None:
+            return False
+
+        period = generation - earlier if self.period is None else gcd(self.period, generation - earlier)
+        if period == self.period:
+            return False
+
+        self.period = period
+        self.start = self.cycle_start(earlier)
+        return True
+
+    def cycle_start(self, generation):
+        # Earliest sampled generation that already repeats period generations later.
+        while True:
+            key = self.keys.get(generation - 1)
+            if key is None or key != self.keys.get(generation - 1 + self.period):
+                return generation
+            generation -= 1
+
+    def remaining(self, generation, generations):
+        # Generations that actually have to be computed to get from generation to generation + generations.
+        if self.period is None or generation < self.start:
+            return generations
+        return generations % self.period
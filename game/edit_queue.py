@@ -0,0 +1,62 @@
+import numpy as np
+
+def line_cells(start, end):
+    # Every cell on the segment between two grid cells, 8-connected, so fast strokes leave no gaps.
+    (start_row, start_col), (end_row, end_col) = start, end
+    steps = max(abs(end_row - start_row), abs(end_col - start_col))
+
+    t = np.linspace(0, 1, steps + 1)
+    rows = np.rint(start_row + (end_row - start_row) * t).astype(np.int64)
+    cols = np.rint(start_col + (end_col - start_col) * t).astype(np.int64)
+
+    return rows, cols
+
+def brush_offsets(size, shape):
+    radius = size - 1
+    offset_rows, offset_cols = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+
+    if shape == "Circle":
+        inside = offset_rows ** 2 + offset_cols ** 2 <= radius * radius + radius
+        offset_rows, offset_cols = offset_rows[inside], offset_cols[inside]
+
+    return offset_rows.ravel(), offset_cols.ravel()
+
+class EditQueue:
+    # Edits collected during a frame, flushed as one deduplicated batch where later edits win.
+    def __init__(self):
+        self.chunks = []
+
+    def __bool__(self):
+        return bool(self.chunks)
+
+    def add(self, rows, cols, value):
+        self.chunks.append((np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64), value))
+
+    def stroke(self, start, end, value, brush_size=1, brush_shape="Square"):
+        rows, cols = line_cells(start, end)
+        offset_rows, offset_cols = brush_offsets(brush_size, brush_shape)
+
+        self.add((rows[:, None] + offset_rows).ravel(), (cols[:, None] + offset_cols).ravel(), value)
+
+    def rectangle(self, start, end, value):
+        (start_row, start_col), (end_row, end_col) = start, end
+        rows, cols = np.mgrid[min(start_row, end_row):max(start_row, end_row) + 1, min(start_col, end_col):max(start_col, end_col) + 1]
+
+        self.add(rows.ravel(), cols.ravel(), value)
+
+    def flush(self, grid_rows, grid_cols):
+        # (rows, cols, values) inside the grid, every cell at most once.
+        chunks, self.chunks = self.chunks, []
+
+        rows = np.concatenate([chunk_rows for chunk_rows, _, _ in chunks])
+        cols = np.concatenate([chunk_cols for _, chunk_cols, _ in chunks])
+        values = np.concatenate([np.full(len(chunk_rows), value, dtype=np.uint8) for chunk_rows, _, value in chunks])
+
+        inside = (rows >= 0) & (rows < grid_rows) & (cols >= 0) & (cols < grid_cols)
+        rows, cols, values = rows[inside], cols[inside], values[inside]
+
+        # np.unique keeps the first occurrence, so search the reversed edits to keep the last one.
+        _, last = np.unique((rows * grid_cols + cols)[::-1], return_index=True)
+        last = len(rows) - 1 - last
+
+        return rows[last], cols[last], values[last]
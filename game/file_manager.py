@@ -1,6 +1,6 @@
 import arcade, arcade.gui, os, time
 
-from game.file_support import save_file
+from game.file_support import save_file, file_type_from_path
 from utils.constants import button_style
 from utils.preload import button_texture, button_hovered_texture
 
@@ -8,9 +8,13 @@ from arcade.gui.experimental.scroll_area import UIScrollArea, UIScrollBar
 from arcade.gui.experimental.focus import UIFocusGroup
 
 class FileManager(arcade.gui.UIView):
-    def __init__(self, start_directory, allowed_extensions, save=False, *args):
+    def __init__(self, start_directory, allowed_extensions, save=False, *args, stamp_into=None, snapshot=None, universe=None):
         super().__init__()
 
+        self.stamp_into = stamp_into # running Game to add the chosen pattern to, instead of starting a new one
+        self.snapshot = snapshot or {} # board size, position and header fields used when saving a snapshot
+        self.universe = universe # HashLife universe to save as Macrocell without going through the cells
+
         self.current_directory = start_directory
         self.allowed_extensions = allowed_extensions
         self.file_buttons = []
@@ -56,12 +60,16 @@ class FileManager(arcade.gui.UIView):
     def submit(self, content):
         self.submitted_content = content
 
-        if os.path.isfile(content):
+        if os.path.isfile(content) and self.stamp_into is not None:
+            self.stamp_into.stamp_pattern(self.submitted_content)
+            self.window.show_view(self.stamp_into)
+        elif os.path.isfile(content):
             from game.play import Game
             self.window.show_view(Game(*self.args, load_from=self.submitted_content))
 
     def save_content(self):
-        save_file(self.args[-1], f"{self.current_directory}/{self.save_filename_input.text}", "rle")
+        file_path = f"{self.current_directory}/{self.save_filename_input.text}"
+        save_file(self.args[3], file_path, file_type_from_path(file_path), universe=self.universe, **self.snapshot) # args are the Game arguments, [3] is cell_grid
 
     def get_content(self, directory):
         if not directory in self.content_cache or time.perf_counter() - self.content_cache[directory][-1] >= 30:
@@ -138,6 +146,10 @@ class FileManager(arcade.gui.UIView):
             self.main_exit()
     
     def main_exit(self):
+        if self.stamp_into is not None:
+            self.window.show_view(self.stamp_into)
+            return
+
         from game.play import Game
         self.window.show_view(Game(*self.args))
 
@@ -1,5 +1,15 @@
 import re
 
+import numpy as np
+
+from game.bitpacked import WORD_BITS, unpack, word_count
+from game.snapshot import SNAPSHOT_EXTENSION, load_snapshot, save_cells_snapshot
+from game.macrocell import MACROCELL_EXTENSION, load_macrocell, centre_window, write_macrocell
+from game.hashlife import HashLife
+from game.rules import LIFE_RULE
+
+LIFE_EXTENSIONS = (".lif", ".life")
+
 def load_life_6(offset_x, offset_y, data):
     loaded_data = []
 
@@ -14,15 +24,6 @@ def load_life_6(offset_x, offset_y, data):
 
     return loaded_data
 
-def save_life_6(cell_grid):
-    data = "#Life 1.06"
-    alive_cells = [(row, col) for row in range(len(cell_grid)) for col in range(len(cell_grid[row])) if cell_grid[row][col]]
-
-    for cell in alive_cells:
-        data += f"\n{cell[0]} {cell[1]}"
-
-    return data
-
 def load_life_5(offset_x, offset_y, data):
     loaded_data = []
 
@@ -39,110 +40,327 @@ def load_life_5(offset_x, offset_y, data):
 
     return loaded_data
 
-def save_life_5(cell_grid):
-    data = "#Life 1.05\n#D Exported from csd4ni3l's Game Of Life viewer.\n#N\n"
+RLE_HEADER = re.compile(r"(\w+)\s*=\s*([^,\s]+)")
+
+def read_rle_header(file):
+    # Skips comments and parses "x = m, y = n, rule = abc". Returns the header and any body text read past it.
+    header = {"x": 0, "y": 0, "rule": LIFE_RULE}
+
+    for line in file:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        if line.startswith("x"):
+            # the rule runs to the end of the line, bounded grid suffixes like B3/S23:P10,10 have commas in them
+            sizes, _, rule = line.partition("rule")
+            for key, value in RLE_HEADER.findall(sizes):
+                header[key] = int(value) if key in ("x", "y") else value
+            if "=" in rule:
+                header["rule"] = rule.split("=", 1)[1].strip()
+            return header, ""
+
+        return header, "".join(line.split())
+
+    return header, ""
+
+def decode_rle_tokens(body):
+    # (counts, symbols) of every token in whitespace-free RLE body text, run counts parsed without a Python loop.
+    text = np.frombuffer(body.encode("ascii"), dtype=np.uint8)
+    is_digit = (text >= ord("0")) & (text <= ord("9"))
+    symbol_index = np.flatnonzero(~is_digit)
+
+    digit_index = np.flatnonzero(is_digit)
+    token = np.searchsorted(symbol_index, digit_index) # every digit belongs to the next symbol
+    place = symbol_index[token] - digit_index - 1
+    values = (text[digit_index] - ord("0")).astype(np.int64) * 10 ** place
+
+    counts = np.zeros(len(symbol_index), dtype=np.int64)
+    np.add.at(counts, token, values)
+    counts[np.bincount(token, minlength=len(symbol_index)) == 0] = 1
+
+    return counts, text[symbol_index]
+
+def read_rle(file, chunk_size=1 << 16):
+    # Streams an RLE file in chunks straight into bit-packed rows. Returns (header, words, width).
+    header, body = read_rle_header(file)
+    width, height = max(header["x"], 1), max(header["y"], 1)
+    words = np.zeros((height, word_count(width)), dtype=np.uint64)
+
+    row, col, pending = 0, 0, body
+    while True:
+        chunk = file.read(chunk_size)
+        body = pending + "".join(chunk.split())
+
+        end = body.find("!")
+        if end != -1:
+            body = body[:end + 1]
+        else: # trailing digits belong to the next chunk's first symbol
+            split = len(body.rstrip("0123456789"))
+            body, pending = body[:split], body[split:]
+
+        if body:
+            counts, symbols = decode_rle_tokens(body)
+            # "o", or "A" in multi-state files, everything else but "$" and "!" is a dead or dying cell
+            newline, alive = symbols == ord("$"), (symbols == ord("o")) | (symbols == ord("A"))
+            dead = ~(newline | alive | (symbols == ord("!")))
+
+            # Each token's start cell: rows add up over $, columns restart after the latest $.
+            advance = np.where(newline | ~(alive | dead), 0, counts)
+            end_col = np.cumsum(advance)
+            start_col = end_col - advance
+            line_start = np.maximum.accumulate(np.where(newline, end_col, 0))
+            after_newline = np.cumsum(newline) > 0
+
+            row_step = np.where(newline, counts, 0)
+            token_row = row + np.cumsum(row_step) - row_step
+            token_col = start_col - line_start + np.where(after_newline, 0, col)
+
+            words = set_runs(words, token_row[alive], token_col[alive], counts[alive])
+            width = max(width, int((token_col[alive] + counts[alive]).max(initial=0)))
+
+            row += int(row_step.sum())
+            col = int(end_col[-1] - line_start[-1]) + (0 if after_newline[-1] else col)
+
+        if end != -1 or not chunk:
+            break
 
-    for row_list in cell_grid.values():
-        for cell in row_list.values():
-            data += "*" if cell else "."
+    return header, words[:max(row + 1, header["y"], 1)], width
 
-        data += "\n"
+def set_runs(words, rows, cols, lengths):
+    # Turns on lengths[i] cells from (rows[i], cols[i]), growing the buffer if the header undercounted.
+    cell_rows = np.repeat(rows, lengths)
+    cell_cols = np.repeat(cols - (np.cumsum(lengths) - lengths), lengths) + np.arange(len(cell_rows))
 
-    return data
+    if not len(cell_rows):
+        return words
 
-def load_rle(offset_x, offset_y, data):
-    loaded_data = []
-    rle_data = ""
-    x_offset = int(offset_x)
-    y_offset = int(offset_y)
-    y = 0
-    x = 0
+    needed_rows, needed_words = int(cell_rows[-1]) + 1, int(cell_cols.max()) // WORD_BITS + 1
+    if needed_rows > words.shape[0] or needed_words > words.shape[1]:
+        grown = np.zeros((max(needed_rows, words.shape[0] * 2), max(needed_words, words.shape[1])), dtype=np.uint64)
+        grown[:words.shape[0], :words.shape[1]] = words
+        words = grown
 
-    for line in data:
-        line = line.strip()
-        if not line or line.startswith("#") or line.startswith("x"):
+    # Runs arrive sorted by row then column, so every word's bits are one contiguous slice.
+    word_index = cell_rows * words.shape[1] + cell_cols // WORD_BITS
+    bits = np.left_shift(np.uint64(1), (cell_cols % WORD_BITS).astype(np.uint64))
+    starts = np.flatnonzero(np.diff(word_index, prepend=-1))
+
+    flat = words.reshape(-1)
+    flat[word_index[starts]] |= np.bitwise_or.reduceat(bits, starts)
+
+    return words
+
+def load_rle(offset_x, offset_y, file):
+    _, words, width = read_rle(file)
+    return np.argwhere(unpack(words, width)) + (int(offset_y), int(offset_x))
+
+RLE_LINE_WIDTH = 70
+MACROCELL_WINDOW = 8192 # largest square of a Macrocell pattern load_file rasterises, the centre of bigger ones
+
+def crop(cells):
+    # Smallest slice of cells holding every live cell.
+    rows, cols = np.flatnonzero(cells.any(axis=1)), np.flatnonzero(cells.any(axis=0))
+    if not len(rows):
+        return cells[:0, :0]
+
+    return cells[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+def rle_tokens(cells, band_rows=1024):
+    # (counts, symbols) for a band of rows at a time: every run of equal cells in a row, minus the
+    # trailing dead one, with "$" tokens wherever the row changes.
+    height, width = cells.shape
+    last_row = 0
+
+    for band_start in range(0, height, band_rows):
+        band = cells[band_start:band_start + band_rows] != 0
+
+        starts = np.ones(band.shape, dtype=bool)
+        starts[:, 1:] = band[:, 1:] != band[:, :-1]
+        run_rows, run_cols = np.nonzero(starts)
+        lengths = np.diff(run_rows * width + run_cols, append=band.size)
+        alive = band[run_rows, run_cols]
+
+        keep = alive | (run_cols + lengths < width)
+        run_rows, lengths, alive = run_rows[keep] + band_start, lengths[keep], alive[keep]
+        if not len(run_rows):
             continue
 
-        rle_data += line
-
-    pattern = re.compile(r"(\d*)([bo$!])")
-    matches = pattern.findall(rle_data)
-
-    for count_str, symbol in matches:
-        count = int(count_str) if count_str else 1
-        if symbol == "b":
-            x += count
-        elif symbol == "o":
-            for _ in range(count):
-                loaded_data.append((y_offset + y, x_offset + x))
-                x += 1
-        elif symbol == "$":
-            y += count
-            x = 0
-        elif symbol == "!":
+        # A "$" goes before every run that starts a new row, counting the rows it skips.
+        row_steps = np.diff(run_rows, prepend=last_row)
+        newline = row_steps > 0
+        last_row = int(run_rows[-1])
+
+        counts = np.empty(len(run_rows) + int(newline.sum()), dtype=np.int64)
+        symbols = np.empty(len(counts), dtype=np.uint8)
+        run_index = np.arange(len(run_rows)) + np.cumsum(newline)
+
+        counts[run_index], symbols[run_index] = lengths, np.where(alive, ord("o"), ord("b"))
+        counts[run_index[newline] - 1], symbols[run_index[newline] - 1] = row_steps[newline], ord("$")
+
+        yield counts, symbols
+
+def number_text(numbers, suffixes, skip_ones=False):
+    # Decimal numbers each followed by a suffix byte, and where each one ends, built without a Python loop.
+    # With skip_ones a 1 is left out, the way RLE run counts are written.
+    digits = np.ones(len(numbers), dtype=np.int64)
+    for power in range(1, 19):
+        digits += numbers >= 10 ** power
+    if skip_ones:
+        digits[numbers == 1] = 0
+
+    ends = np.cumsum(digits + 1)
+    starts = ends - digits - 1
+    text = np.empty(int(ends[-1]), dtype=np.uint8)
+    text[ends - 1] = suffixes
+
+    number = np.repeat(np.arange(len(numbers)), digits)
+    place = np.arange(len(number)) - np.repeat(np.cumsum(digits) - digits, digits)
+    power = digits[number] - 1 - place
+    text[starts[number] + place] = ord("0") + numbers[number] // 10 ** power % 10
+
+    return text, ends
+
+def write_rle_tokens(file, counts, symbols, column):
+    # Writes tokens wrapped at RLE_LINE_WIDTH without splitting any, returns the column the last line ends at.
+    text, token_ends = number_text(counts, symbols, skip_ones=True)
+    token_starts = np.concatenate(([0], token_ends[:-1]))
+
+    breaks = []
+    line_start, token = -column, 0
+    while True:
+        next_token = int(token_ends.searchsorted(line_start + RLE_LINE_WIDTH, side="right"))
+        if next_token >= len(token_ends):
             break
 
-    return loaded_data
+        line_start, token = int(token_starts[next_token]), next_token
+        breaks.append(line_start)
 
-def save_rle(cell_grid):
-    live_cells = [(row, col) for row in cell_grid for col in cell_grid[row] if cell_grid[row][col]]
+    file.write(np.insert(text, breaks, ord("\n")).tobytes().decode("ascii"))
 
-    if not live_cells:
-        return "#C Empty pattern\nx = 0, y = 0, rule = B3/S23\n!"
+    return int(token_ends[-1]) - line_start
 
-    min_row = min(row for row, _ in live_cells)
-    max_row = max(row for row, _ in live_cells)
-    min_col = min(col for _, col in live_cells)
-    max_col = max(col for _, col in live_cells)
+def write_rle(file, cells, rule=LIFE_RULE):
+    cells = crop(cells)
+    if not cells.size:
+        file.write(f"#C Empty pattern\nx = 0, y = 0, rule = {rule}\n!")
+        return
 
-    width = max_col - min_col + 1
-    height = max_row - min_row + 1
+    file.write("#C Exported from csd4ni3l's Game Of Life viewer.\n")
+    file.write(f"x = {cells.shape[1]}, y = {cells.shape[0]}, rule = {rule}\n")
 
-    data = "#C Exported from csd4ni3l's Game Of Life viewer.\n"
-    data += f"x = {width}, y = {height}, rule = B3/S23\n"
+    column = 0
+    for counts, symbols in rle_tokens(cells):
+        column = write_rle_tokens(file, counts, symbols, column)
 
-    lines = []
-    for row in range(min_row, max_row + 1):
-        line = ""
-        run_char = None
-        run_length = 0
+    write_rle_tokens(file, np.ones(1, dtype=np.int64), np.array([ord("!")], dtype=np.uint8), column)
 
-        for col in range(min_col, max_col + 1):
-            alive = cell_grid.get(row, {}).get(col, False)
-            char = "o" if alive else "b"
+def write_life_5(file, cells, band_rows=1024):
+    file.write("#Life 1.05\n#D Exported from csd4ni3l's Game Of Life viewer.\n#N\n")
 
-            if char == run_char:
-                run_length += 1
-            else:
-                if run_char is not None:
-                    line += (str(run_length) if run_length > 1 else "") + run_char
-                run_char = char
-                run_length = 1
+    for band_start in range(0, len(cells), band_rows):
+        band = cells[band_start:band_start + band_rows]
 
-        if run_char:
-            line += (str(run_length) if run_length > 1 else "") + run_char
+        text = np.full((len(band), band.shape[1] + 1), ord("\n"), dtype=np.uint8)
+        text[:, :-1] = np.where(band != 0, ord("*"), ord("."))
+        file.write(text.tobytes().decode("ascii"))
 
-        lines.append(line)
+def write_life_6(file, cells, band_rows=1024):
+    # Life 1.06 lines are "x y", so column first.
+    file.write("#Life 1.06")
 
-    data += "$".join(lines) + "!"
+    for band_start in range(0, len(cells), band_rows):
+        rows, cols = np.nonzero(cells[band_start:band_start + band_rows])
+        if not len(rows):
+            continue
 
-    return data
+        numbers = np.stack((cols, rows + band_start), axis=1).ravel()
+        suffixes = np.tile(np.array([ord(" "), ord("\n")], dtype=np.uint8), len(rows))
+
+        # the newline goes before each band instead of after it, so the file ends without one like before
+        text, _ = number_text(numbers, suffixes)
+        file.write("\n" + text[:-1].tobytes().decode("ascii"))
 
 def load_file(offset_x, offset_y, file_path):
+    if file_path.endswith(SNAPSHOT_EXTENSION):
+        header, words = load_snapshot(file_path)
+        return np.argwhere(unpack(words, header["cols"])) + (int(offset_y), int(offset_x))
+
+    if file_path.endswith(MACROCELL_EXTENSION):
+        universe = load_macrocell(file_path)
+        size = min(1 << universe.root.level, MACROCELL_WINDOW)
+        top, left = centre_window(universe, size, size)
+        return np.argwhere(universe.window(top, left, size, size)) + (int(offset_y), int(offset_x))
+
     with open(file_path, "r") as file:
+        if file_path.endswith(".rle"):
+            return load_rle(offset_x, offset_y, file)
+
         data = file.read().splitlines()
         if "#Life 1.06" in data:
             return load_life_6(offset_x, offset_y, data)
         elif "#Life 1.05" in data:
             return load_life_5(offset_x, offset_y, data)
-        elif file_path.endswith(".rle"):
-            return load_rle(offset_x, offset_y, data)
 
-def save_file(cell_grid, file_path, file_type):
+    return []
+
+def load_rule(file_path):
+    # Rule text a pattern file was saved with, None if its format doesn't store one.
+    if file_path.endswith(SNAPSHOT_EXTENSION):
+        return load_snapshot(file_path)[0]["rule"]
+
+    with open(file_path, "r") as file:
+        if file_path.endswith(".rle"):
+            return read_rle_header(file)[0]["rule"]
+
+        # Macrocell and Life 1.05 keep it in a "#R" line before the pattern
+        for line in file:
+            if line.startswith("#R"):
+                return line[2:].strip()
+            if not line.startswith(("#", "[")):
+                break
+
+    return None
+
+def cells_from_positions(positions):
+    # Smallest 2D array holding every (row, col) in positions.
+    if not len(positions):
+        return np.zeros((0, 0), dtype=np.uint8)
+
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+    positions -= positions.min(axis=0)
+
+    cells = np.zeros(tuple(positions.max(axis=0) + 1), dtype=np.uint8)
+    cells[positions[:, 0], positions[:, 1]] = 1
+
+    return cells
+
+def file_type_from_path(file_path):
+    # Save format for a file name, .rle for anything that isn't a snapshot, Macrocell or Life file.
+    # Both Life versions use .lif / .life, 1.05 is written unless the name ends in .06.lif / .06.life.
+    if file_path.endswith(SNAPSHOT_EXTENSION):
+        return "snapshot"
+    elif file_path.endswith(MACROCELL_EXTENSION):
+        return "macrocell"
+    elif file_path.endswith(tuple(".06" + extension for extension in LIFE_EXTENSIONS)):
+        return "life_6"
+    elif file_path.endswith(LIFE_EXTENSIONS):
+        return "life_5"
+    return "rle"
+
+def save_file(cells, file_path, file_type, universe=None, rule=LIFE_RULE, **snapshot):
+    # snapshot holds the save_cells_snapshot board and header arguments, the text formats only keep the cells.
+    # Macrocell files are written from universe when there is one instead of building a tree from the cells.
+    if file_type == "snapshot":
+        save_cells_snapshot(file_path, cells, rule=rule, **snapshot)
+        return
+
     with open(file_path, "w") as file:
-        if file_type == "life_6":
-            file.write(save_life_6(cell_grid))
+        if file_type == "macrocell":
+            write_macrocell(file, universe if universe is not None else HashLife(np.argwhere(cells).tolist()), rule)
+        elif file_type == "life_6":
+            write_life_6(file, cells)
         elif file_type == "life_5":
-            file.write(save_life_5(cell_grid))
+            write_life_5(file, cells)
         elif file_type == "rle":
-            file.write(save_rle(cell_grid))
+            write_rle(file, cells, rule)
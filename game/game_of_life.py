@@ -1,83 +1,622 @@
-from utils.constants import ROWS, COLS
+from game.bitpacked import word_count
+from game.rules import NEIGHBOR_OFFSETS
 from pyglet.gl import glBindBufferBase, GL_SHADER_STORAGE_BUFFER, GL_NEAREST
-import pyglet
+import pyglet, struct
 
-shader_source = f"""#version 430 core
+# Additive state hash for cycle detection: every live cell (or non-empty word) adds a well mixed value of its
+# index, so the sum doesn't depend on the order invocations finish in. Two lanes make it 64 bits.
+CELL_HASH_SOURCE = """
+const uint HASH_LANE = 0x9e3779b9u;
+
+uint mix_bits(uint x) {
+    x ^= x >> 16;
+    x *= 0x7feb352du;
+    x ^= x >> 15;
+    x *= 0x846ca68bu;
+    x ^= x >> 16;
+    return x;
+}
+
+uint cell_hash(uint index, uint value, uint lane) {
+    return mix_bits(mix_bits(index ^ lane) ^ value);
+}
+"""
+
+# The rule's lookup table (state * 256 + a bit per live neighbour -> next state), shared by every shader, so any
+# rule runs through the same code. Dying states of Generations rules fade from alive towards dead.
+RULE_SOURCE = f"""
+layout(std430, binding = 7) buffer Rule {{
+    uint rule_table[];
+}};
+
+uniform int states;
+
+const ivec2 NEIGHBOR_OFFSETS[8] = ivec2[8]({", ".join(f"ivec2({dx}, {dy})" for dy, dx in NEIGHBOR_OFFSETS)});
+
+vec4 state_color(int state) {{
+    vec4 dead = vec4(0.19, 0.31, 0.31, 1.0);
+    if (state == 0) {{
+        return dead;
+    }}
+    if (state == 1) {{
+        return vec4(1.0, 1.0, 1.0, 1.0);
+    }}
+    return mix(dead, vec4(1.0, 1.0, 1.0, 1.0), 0.6 * (1.0 - float(state - 1) / float(states - 1)));
+}}
+"""
+
+# Buffers of the active tile version of the tiled shader, one tile per workgroup:
+# tile_flags has bit 0 / 1 set when the tile changed in a generation of even / odd parity (the parity
+# of the pass that reads it) and bit 2 while its texels and stats are older than its cells.
+# tile_stats holds population, min_row, min_col, max_row, max_col, hash_low, hash_high per tile.
+ACTIVE_TILES_SOURCE = """
+layout(std430, binding = 8) buffer TileFlags {
+    uint tile_flags[];
+};
+
+layout(std430, binding = 9) buffer ActiveTiles {
+    uint active_groups[3]; // glDispatchComputeIndirect arguments
+    uint active_tiles[];
+};
+
+layout(std430, binding = 10) buffer TileStats {
+    uint tile_stats[];
+};
+
+uniform int parity;
+"""
+
+# One global atomic per workgroup instead of one per live cell.
+GROUP_STATS_FLUSH = """
+    if (render && gl_LocalInvocationIndex == 0) {
+        if (group_population > 0u) {
+            atomicAdd(population, group_population);
+            atomicMin(min_row, group_min_row);
+            atomicMin(min_col, group_min_col);
+            atomicMax(max_row, group_max_row);
+            atomicMax(max_col, group_max_col);
+        }
+        atomicAdd(hash_low, group_hash_low);
+        atomicAdd(hash_high, group_hash_high);
+    }
+"""
+
+# Active tiles write the stats per tile instead, the reduce pass adds them up once the last pass is done.
+ACTIVE_TILES_FLUSH = """
+    if (gl_LocalInvocationIndex == 0) {
+        uint flags = tile_flags[tile_id];
+        if (group_changed) {
+            flags |= (1u << uint(1 - parity)) | (render ? 0u : 4u);
+        }
+        if (render) {
+            flags &= ~4u;
+
+            uint base = tile_id * 7u;
+            tile_stats[base] = group_population;
+            tile_stats[base + 1u] = uint(group_min_row);
+            tile_stats[base + 2u] = uint(group_min_col);
+            tile_stats[base + 3u] = uint(group_max_row);
+            tile_stats[base + 4u] = uint(group_max_col);
+            tile_stats[base + 5u] = group_hash_low;
+            tile_stats[base + 6u] = group_hash_high;
+        }
+        tile_flags[tile_id] = flags;
+    }
+"""
+
+# Compiled programs by (source, rows, cols, workgroup size), the SSBO sizes are baked into the source
+# so every grid size needs its own program, but switching back to a size reuses it.
+shader_cache = {}
+
+def get_shader_source(rows, cols):
+    return f"""#version 430 core
 
 layout(std430, binding = 3) buffer CellGridIn {{
-    int cell_grid_in[{ROWS * COLS}];
+    int cell_grid_in[{rows * cols}];
 }};
 
 layout(std430, binding = 4) buffer CellGridOut {{
-    int cell_grid_out[{ROWS * COLS}];
+    int cell_grid_out[{rows * cols}];
+}};
+
+layout(std430, binding = 5) buffer Stats {{
+    uint population;
+    int min_row;
+    int min_col;
+    int max_row;
+    int max_col;
+    uint hash_low;
+    uint hash_high;
+    uint generation_low; // written by the CPU with the reset, so readbacks know their generation
+    uint generation_high;
 }};
 
-uniform int mouse_row;
-uniform int mouse_col;
-uniform int mouse_interaction;
 uniform int rows;
 uniform int cols;
 uniform bool running;
+uniform bool render;
 
 layout (local_size_x = 1, local_size_y = 1, local_size_z = 1) in;
 layout(location = 0, rgba32f) uniform image2D img_output;
-
+{CELL_HASH_SOURCE}{RULE_SOURCE}
 void main() {{
     ivec2 texel_coord = ivec2(gl_GlobalInvocationID.xy);
 
     int row = texel_coord.y * rows / imageSize(img_output).y;
     int col = texel_coord.x * cols / imageSize(img_output).x;
     int current_index = (row * cols) + col;
-    int next = 0;
-    int alive_neighbors = 0;
-    int mouse_interaction_index = (mouse_row * cols) + mouse_col;
+    int next = cell_grid_in[current_index];
+
+    if (running) {{
+        uint neighborhood = uint(next) << 8;
+        for (int bit = 0; bit < 8; bit++) {{
+            int nx = texel_coord.x + NEIGHBOR_OFFSETS[bit].x;
+            int ny = texel_coord.y + NEIGHBOR_OFFSETS[bit].y;
+            if (nx >= 0 && nx < cols && ny >= 0 && ny < rows && cell_grid_in[ny * cols + nx] == 1) {{
+                neighborhood |= 1u << bit;
+            }}
+        }}
 
-    if (mouse_interaction != -1 && current_index == mouse_interaction_index) {{
-        next = mouse_interaction;
+        next = int(rule_table[neighborhood]);
     }}
-    else if (!running) {{
-        next = cell_grid_in[current_index];
+
+    cell_grid_out[current_index] = next;
+
+    if (render) {{
+        if (next == 1) {{
+            atomicAdd(population, 1u);
+            atomicMin(min_row, row);
+            atomicMin(min_col, col);
+            atomicMax(max_row, row);
+            atomicMax(max_col, col);
+        }}
+        if (next != 0) {{
+            atomicAdd(hash_low, cell_hash(uint(current_index), uint(next), 0u));
+            atomicAdd(hash_high, cell_hash(uint(current_index), uint(next), HASH_LANE));
+        }}
+
+        imageStore(img_output, texel_coord, state_color(next));
     }}
-    else {{
-        for (int dy = -1; dy <= 1; dy++) {{
-            for (int dx = -1; dx <= 1; dx++) {{
-                if (dx == 0 && dy == 0) continue;
-
-                int nx = texel_coord.x + dx;
-                int ny = texel_coord.y + dy;
-                if (nx >= 0 && nx < cols && ny >= 0 && ny < rows) {{
-                    int neighbor_index = ny * cols + nx;
-                    alive_neighbors += cell_grid_in[neighbor_index];
+}}
+"""
+
+# Bit-packed variant: 32 cells per uint (GLSL 4.30 has no 64-bit integers without extensions),
+# one invocation steps a whole word with bit-sliced adders and writes its 32 texels.
+# Words per workgroup of the packed shader, a row of words is dispatched as rows of these.
+PACKED_WORKGROUP_WIDTH = 64
+
+def get_packed_shader_source(rows, cols):
+    return f"""#version 430 core
+
+layout(std430, binding = 3) buffer CellGridIn {{
+    uint cell_grid_in[{rows * word_count(cols, 32)}];
+}};
+
+layout(std430, binding = 4) buffer CellGridOut {{
+    uint cell_grid_out[{rows * word_count(cols, 32)}];
+}};
+
+layout(std430, binding = 5) buffer Stats {{
+    uint population;
+    int min_row;
+    int min_col;
+    int max_row;
+    int max_col;
+    uint hash_low;
+    uint hash_high;
+    uint generation_low; // written by the CPU with the reset, so readbacks know their generation
+    uint generation_high;
+}};
+
+uniform int rows;
+uniform int cols;
+uniform int words;
+uniform bool running;
+uniform bool render;
+
+layout (local_size_x = {PACKED_WORKGROUP_WIDTH}, local_size_y = 1, local_size_z = 1) in;
+layout(location = 0, rgba32f) uniform image2D img_output;
+{CELL_HASH_SOURCE}{RULE_SOURCE}
+uint load_word(int row, int word) {{
+    if (row < 0 || row >= rows || word < 0 || word >= words) {{
+        return 0u;
+    }}
+    return cell_grid_in[row * words + word];
+}}
+
+uint west(int row, int word) {{
+    return (load_word(row, word) << 1) | (load_word(row, word - 1) >> 31);
+}}
+
+uint east(int row, int word) {{
+    return (load_word(row, word) >> 1) | (load_word(row, word + 1) << 31);
+}}
+
+void main() {{
+    int word = int(gl_GlobalInvocationID.x);
+    int row = int(gl_GlobalInvocationID.y);
+    if (word >= words || row >= rows) {{ // the last workgroup of a row runs past its end
+        return;
+    }}
+
+    uint alive = load_word(row, word);
+    uint next = alive;
+
+    if (running) {{
+        uint top_west = west(row - 1, word), top = load_word(row - 1, word), top_east = east(row - 1, word);
+        uint bottom_west = west(row + 1, word), bottom = load_word(row + 1, word), bottom_east = east(row + 1, word);
+        uint middle_west = west(row, word), middle_east = east(row, word);
+
+        uint top_sum = top_west ^ top ^ top_east;
+        uint top_carry = (top_west & top) | (top_east & (top_west ^ top));
+        uint bottom_sum = bottom_west ^ bottom ^ bottom_east;
+        uint bottom_carry = (bottom_west & bottom) | (bottom_east & (bottom_west ^ bottom));
+        uint middle_sum = middle_west ^ middle_east;
+        uint middle_carry = middle_west & middle_east;
+
+        // neighbour count 0-8 as four bit planes
+        uint ones = top_sum ^ bottom_sum ^ middle_sum;
+        uint ones_carry = (top_sum & bottom_sum) | (middle_sum & (top_sum ^ bottom_sum));
+
+        uint low_sum = top_carry ^ bottom_carry, low_carry = top_carry & bottom_carry;
+        uint high_sum = middle_carry ^ ones_carry, high_carry = middle_carry & ones_carry;
+        uint twos = low_sum ^ high_sum, twos_carry = low_sum & high_sum;
+        uint fours = low_carry ^ high_carry ^ twos_carry;
+        uint eights = (low_carry & high_carry) | (twos_carry & (low_carry ^ high_carry));
+
+        // Totalistic rules only: the table entry of the first neighbourhood with each count stands for all of them.
+        // Every invocation reads the same entries, so these branches never diverge.
+        next = 0u;
+        for (uint count = 0u; count <= 8u; count++) {{
+            bool born = rule_table[(1u << count) - 1u] == 1u;
+            bool survives = rule_table[256u + (1u << count) - 1u] == 1u;
+            if (!born && !survives) {{
+                continue;
+            }}
+
+            uint matches = ((count & 1u) != 0u ? ones : ~ones) & ((count & 2u) != 0u ? twos : ~twos)
+                         & ((count & 4u) != 0u ? fours : ~fours) & ((count & 8u) != 0u ? eights : ~eights);
+            next |= matches & ((born ? ~alive : 0u) | (survives ? alive : 0u));
+        }}
+    }}
+
+    int valid_bits = min(32, cols - word * 32);
+    if (valid_bits < 32) {{
+        next &= (1u << uint(valid_bits)) - 1u;
+    }}
+
+    cell_grid_out[row * words + word] = next;
+
+    if (!render) {{
+        return;
+    }}
+
+    if (next != 0u) {{
+        atomicAdd(population, uint(bitCount(next)));
+        atomicMin(min_row, row);
+        atomicMin(min_col, word * 32 + findLSB(next));
+        atomicMax(max_row, row);
+        atomicMax(max_col, word * 32 + findMSB(next));
+        atomicAdd(hash_low, cell_hash(uint(row * words + word), next, 0u));
+        atomicAdd(hash_high, cell_hash(uint(row * words + word), next, HASH_LANE));
+    }}
+
+    for (int bit = 0; bit < valid_bits; bit++) {{
+        imageStore(img_output, ivec2(word * 32 + bit, row), state_color(int((next >> uint(bit)) & 1u)));
+    }}
+}}
+"""
+
+# Tiled variant: each 2D workgroup loads its tile plus a one cell halo into shared memory once,
+# so the 8 neighbour reads per cell hit shared memory instead of the SSBO.
+# With active set, only the tiles in the active list are dispatched (see game/active_tiles.py), every
+# workgroup flags its tile when a cell changed and writes the tile's stats for the reduce pass.
+def get_tiled_shader_source(rows, cols, local_x, local_y, active=False):
+    tile_cols = (cols + local_x - 1) // local_x
+    return f"""#version 430 core
+
+layout(std430, binding = 3) buffer CellGridIn {{
+    int cell_grid_in[{rows * cols}];
+}};
+
+layout(std430, binding = 4) buffer CellGridOut {{
+    int cell_grid_out[{rows * cols}];
+}};
+
+layout(std430, binding = 5) buffer Stats {{
+    uint population;
+    int min_row;
+    int min_col;
+    int max_row;
+    int max_col;
+    uint hash_low;
+    uint hash_high;
+    uint generation_low; // written by the CPU with the reset, so readbacks know their generation
+    uint generation_high;
+}};
+
+uniform int rows;
+uniform int cols;
+uniform bool running;
+uniform bool render;
+
+layout (local_size_x = {local_x}, local_size_y = {local_y}, local_size_z = 1) in;
+layout(location = 0, rgba32f) uniform image2D img_output;
+{ACTIVE_TILES_SOURCE if active else ""}
+const int TILE_WIDTH = {local_x + 2};
+const int TILE_HEIGHT = {local_y + 2};
+shared int tile[TILE_WIDTH * TILE_HEIGHT];
+shared uint group_population;
+shared int group_min_row;
+shared int group_min_col;
+shared int group_max_row;
+shared int group_max_col;
+shared uint group_hash_low;
+shared uint group_hash_high;
+shared bool group_changed;
+{CELL_HASH_SOURCE}{RULE_SOURCE}
+void main() {{
+    {f"uint tile_id = active_tiles[gl_WorkGroupID.x];{chr(10)}    ivec2 group = ivec2(tile_id % {tile_cols}u, tile_id / {tile_cols}u);" if active else "ivec2 group = ivec2(gl_WorkGroupID.xy);"}
+    ivec2 group_origin = group * ivec2({local_x}, {local_y}) - ivec2(1, 1);
+
+    if (gl_LocalInvocationIndex == 0) {{
+        group_changed = false;
+        group_population = 0u;
+        group_min_row = rows;
+        group_min_col = cols;
+        group_max_row = -1;
+        group_max_col = -1;
+        group_hash_low = 0u;
+        group_hash_high = 0u;
+    }}
+
+    for (int tile_index = int(gl_LocalInvocationIndex); tile_index < TILE_WIDTH * TILE_HEIGHT; tile_index += {local_x * local_y}) {{
+        int tile_col = group_origin.x + tile_index % TILE_WIDTH;
+        int tile_row = group_origin.y + tile_index / TILE_WIDTH;
+
+        if (tile_col >= 0 && tile_col < cols && tile_row >= 0 && tile_row < rows) {{
+            tile[tile_index] = cell_grid_in[tile_row * cols + tile_col];
+        }}
+        else {{
+            tile[tile_index] = 0;
+        }}
+    }}
+
+    barrier();
+
+    int col = group_origin.x + 1 + int(gl_LocalInvocationID.x);
+    int row = group_origin.y + 1 + int(gl_LocalInvocationID.y);
+
+    // No early return for cells outside of the grid, every invocation has to reach the barriers.
+    if (col < cols && row < rows) {{
+        int local_index = (int(gl_LocalInvocationID.y) + 1) * TILE_WIDTH + int(gl_LocalInvocationID.x) + 1;
+        int next = tile[local_index];
+
+        if (running) {{
+            uint neighborhood = uint(next) << 8;
+            for (int bit = 0; bit < 8; bit++) {{
+                if (tile[local_index + NEIGHBOR_OFFSETS[bit].y * TILE_WIDTH + NEIGHBOR_OFFSETS[bit].x] == 1) {{
+                    neighborhood |= 1u << bit;
                 }}
             }}
+
+            next = int(rule_table[neighborhood]);
+            if (next != tile[local_index]) {{
+                group_changed = true;
+            }}
         }}
 
-        if (cell_grid_in[current_index] == 0 && alive_neighbors == 3) {{
-            next = 1;
+        cell_grid_out[row * cols + col] = next;
+
+        if (render) {{
+            if (next == 1) {{
+                atomicAdd(group_population, 1u);
+                atomicMin(group_min_row, row);
+                atomicMin(group_min_col, col);
+                atomicMax(group_max_row, row);
+                atomicMax(group_max_col, col);
+            }}
+            if (next != 0) {{
+                atomicAdd(group_hash_low, cell_hash(uint(row * cols + col), uint(next), 0u));
+                atomicAdd(group_hash_high, cell_hash(uint(row * cols + col), uint(next), HASH_LANE));
+            }}
+
+            imageStore(img_output, ivec2(col, row), state_color(next));
         }}
-        else if (cell_grid_in[current_index] == 1 && (alive_neighbors == 3 || alive_neighbors == 2)) {{
-            next = 1;
-        }}  
+    }}
+
+    barrier();
+{ACTIVE_TILES_FLUSH if active else GROUP_STATS_FLUSH}}}
+"""
+
+# Edit passes: apply a batch of queued edits to the current grid and its texels in one small dispatch.
+def get_edit_shader_source(rows, cols):
+    return f"""#version 430 core
+
+layout(std430, binding = 3) buffer CellGridIn {{
+    int cell_grid_in[{rows * cols}];
+}};
+
+// (cell index, value) pairs
+layout(std430, binding = 6) buffer Edits {{
+    ivec2 edits[];
+}};
+
+// active tile flags, only touched when tile_cols isn't 0
+layout(std430, binding = 8) buffer TileFlags {{
+    uint tile_flags[];
+}};
+
+uniform int edit_count;
+uniform int cols;
+uniform int tile_cols;
+uniform ivec2 tile_size;
+
+layout (local_size_x = 64, local_size_y = 1, local_size_z = 1) in;
+layout(location = 0, rgba32f) uniform image2D img_output;
+
+void main() {{
+    int edit_index = int(gl_GlobalInvocationID.x);
+    if (edit_index >= edit_count) {{
+        return;
+    }}
+
+    ivec2 edit = edits[edit_index];
+    cell_grid_in[edit.x] = edit.y;
+
+    if (tile_cols > 0) {{ // the tile and its neighbours are stepped again, and it's redrawn on the next render
+        atomicOr(tile_flags[(edit.x / cols / tile_size.y) * tile_cols + edit.x % cols / tile_size.x], 7u);
     }}
 
     vec4 value;
-    if (next == 1) {{
+    if (edit.y == 1) {{
         value = vec4(1.0, 1.0, 1.0, 1.0);
     }}
     else {{
         value = vec4(0.19, 0.31, 0.31, 1.0);
     }}
 
-    cell_grid_out[current_index] = next;
+    imageStore(img_output, ivec2(edit.x % cols, edit.x / cols), value);
+}}
+"""
+
+def get_packed_edit_shader_source(rows, cols):
+    return f"""#version 430 core
+
+layout(std430, binding = 3) buffer CellGridIn {{
+    uint cell_grid_in[{rows * word_count(cols, 32)}];
+}};
+
+// (word index, bits to set, bits to clear, unused), every word at most once per batch
+layout(std430, binding = 6) buffer Edits {{
+    uvec4 edits[];
+}};
+
+uniform int edit_count;
+uniform int cols;
+uniform int words;
+
+layout (local_size_x = 64, local_size_y = 1, local_size_z = 1) in;
+layout(location = 0, rgba32f) uniform image2D img_output;
+
+void main() {{
+    int edit_index = int(gl_GlobalInvocationID.x);
+    if (edit_index >= edit_count) {{
+        return;
+    }}
 
-    imageStore(img_output, texel_coord, value);
+    uvec4 edit = edits[edit_index];
+    int word = int(edit.x) % words;
+    int row = int(edit.x) / words;
+
+    uint next = (cell_grid_in[edit.x] & ~edit.z) | edit.y;
+    cell_grid_in[edit.x] = next;
+
+    int valid_bits = min(32, cols - word * 32);
+    for (int bit = 0; bit < valid_bits; bit++) {{
+        vec4 value;
+        if (((next >> uint(bit)) & 1u) == 1u) {{
+            value = vec4(1.0, 1.0, 1.0, 1.0);
+        }}
+        else {{
+            value = vec4(0.19, 0.31, 0.31, 1.0);
+        }}
+
+        imageStore(img_output, ivec2(word * 32 + bit, row), value);
+    }}
+}}
+"""
+
+def get_history_pack_shader_source(rows, cols, planes):
+    # Packs the board into one bit plane per bit of the cell states for the rewind history, laid out like the
+    # GPU Bit-Packed buffer, so the copy read back is a bit per cell instead of an int.
+    words = word_count(cols, 32)
+    return f"""#version 430 core
+
+layout(std430, binding = 3) buffer CellGridIn {{
+    int cell_grid_in[{rows * cols}];
+}};
+
+layout(std430, binding = 11) buffer History {{
+    uint history[{planes * rows * words}];
+}};
+
+layout (local_size_x = 64, local_size_y = 1, local_size_z = 1) in;
+
+void main() {{
+    int word = int(gl_GlobalInvocationID.x);
+    int row = int(gl_GlobalInvocationID.y);
+    if (word >= {words}) {{
+        return;
+    }}
+
+    uint bits[{planes}];
+    for (int plane = 0; plane < {planes}; plane++) {{
+        bits[plane] = 0u;
+    }}
+
+    int valid_bits = min(32, {cols} - word * 32);
+    for (int bit = 0; bit < valid_bits; bit++) {{
+        uint cell = uint(cell_grid_in[row * {cols} + word * 32 + bit]);
+        for (int plane = 0; plane < {planes}; plane++) {{
+            bits[plane] |= ((cell >> uint(plane)) & 1u) << uint(bit);
+        }}
+    }}
+
+    for (int plane = 0; plane < {planes}; plane++) {{
+        history[(plane * {rows} + row) * {words} + word] = bits[plane];
+    }}
 }}
 """
 
-def create_shader(grid):
-    shader_program = pyglet.graphics.shader.ComputeShaderProgram(shader_source)
+def get_shader_program(get_source, rows, cols, *args):
+    key = (get_source.__name__, rows, cols, *args)
+    if key not in shader_cache:
+        shader_cache[key] = pyglet.graphics.shader.ComputeShaderProgram(get_source(rows, cols, *args))
+    return shader_cache[key]
+
+def create_texture(rows, cols):
+    return pyglet.image.Texture.create(cols, rows, internalformat=pyglet.gl.GL_RGBA32F, min_filter=GL_NEAREST, mag_filter=GL_NEAREST)
 
-    game_of_life_image = pyglet.image.Texture.create(COLS, ROWS, internalformat=pyglet.gl.GL_RGBA32F, min_filter=GL_NEAREST, mag_filter=GL_NEAREST)
+# population, min_row, min_col, max_row, max_col, state hash (two lanes) of the last rendered pass, and its generation
+STATS_FORMAT = "<IiiiiIIq"
+
+def stats_reset(generation=0):
+    return struct.pack(STATS_FORMAT, 0, 2 ** 31 - 1, 2 ** 31 - 1, -1, -1, 0, 0, generation)
+
+def create_stats_buffer():
+    stats_buffer = pyglet.graphics.BufferObject(struct.calcsize(STATS_FORMAT), usage=pyglet.gl.GL_DYNAMIC_COPY)
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 5, stats_buffer.id)
+
+    return stats_buffer
+
+def create_rule_buffer(rule):
+    table = rule.table.astype("<u4")
+    rule_buffer = pyglet.graphics.BufferObject(table.nbytes, usage=pyglet.gl.GL_STATIC_DRAW)
+    rule_buffer.set_data(table.tobytes())
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 7, rule_buffer.id)
+
+    return rule_buffer
+
+def create_history_buffer(rows, cols, planes):
+    history_buffer = pyglet.graphics.BufferObject(planes * rows * word_count(cols, 32) * 4, usage=pyglet.gl.GL_STREAM_COPY)
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 11, history_buffer.id)
+
+    return history_buffer
+
+def create_edit_buffer(size):
+    edit_buffer = pyglet.graphics.BufferObject(size, usage=pyglet.gl.GL_STREAM_DRAW)
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 6, edit_buffer.id)
+
+    return edit_buffer
+
+def create_shader(grid, rows, cols, workgroup_size=(1, 1), active=False):
+    if workgroup_size == (1, 1):
+        shader_program = get_shader_program(get_shader_source, rows, cols)
+    else:
+        shader_program = get_shader_program(get_tiled_shader_source, rows, cols, *workgroup_size, active)
+
+    game_of_life_image = create_texture(rows, cols)
 
     uniform_location = shader_program['img_output']
     game_of_life_image.bind_image_texture(unit=uniform_location)
@@ -87,4 +626,39 @@ def create_shader(grid):
     glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 3, ssbo_in.id)
     glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 4, ssbo_out.id)
 
-    return shader_program, game_of_life_image, ssbo_in, ssbo_out
\ No newline at end of file
+    return shader_program, game_of_life_image, ssbo_in, ssbo_out
+
+def create_packed_shader(words, rows, cols):
+    shader_program = get_shader_program(get_packed_shader_source, rows, cols)
+
+    game_of_life_image = create_texture(rows, cols)
+
+    uniform_location = shader_program['img_output']
+    game_of_life_image.bind_image_texture(unit=uniform_location)
+
+    ssbo_in = pyglet.graphics.BufferObject(words.nbytes, usage=pyglet.gl.GL_DYNAMIC_COPY)
+    ssbo_out = pyglet.graphics.BufferObject(words.nbytes, usage=pyglet.gl.GL_DYNAMIC_COPY)
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 3, ssbo_in.id)
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 4, ssbo_out.id)
+
+    return shader_program, game_of_life_image, ssbo_in, ssbo_out
+
+def dispatch_groups(rows, cols, workgroup_size=(1, 1), packed=False):
+    if packed: # one invocation per word
+        return (word_count(cols, 32) + PACKED_WORKGROUP_WIDTH - 1) // PACKED_WORKGROUP_WIDTH, rows
+
+    group_x, group_y = workgroup_size
+    return (cols + group_x - 1) // group_x, (rows + group_y - 1) // group_y
+
+def dispatch_generations(shader_program, ssbo_in, ssbo_out, groups, generations):
+    # Runs one pass per generation, only the last one renders and writes stats. Returns the buffers
+    # swapped into their new in/out roles. The shader program has to be in use.
+    for generation in range(generations):
+        shader_program['render'] = generation == generations - 1
+        shader_program.dispatch(*groups, 1, barrier=pyglet.gl.GL_ALL_BARRIER_BITS)
+
+        ssbo_in, ssbo_out = ssbo_out, ssbo_in
+        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 3, ssbo_in.id)
+        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 4, ssbo_out.id)
+
+    return ssbo_in, ssbo_out
@@ -0,0 +1,71 @@
+import ctypes, pyglet
+
+from pyglet.gl import glCopyBufferSubData, glFenceSync, glClientWaitSync, glDeleteSync, glBindBuffer, glGetBufferSubData, GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER, GL_SYNC_GPU_COMMANDS_COMPLETE, GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED
+
+class AsyncReadback:
+    # Copies part of a GPU buffer into one of a few staging buffers and fences it. poll() only reads
+    # a staging buffer once its fence has signaled, so the render loop never waits on the GPU.
+    def __init__(self, size, slots=3):
+        self.size = size
+        self.staging = [pyglet.graphics.BufferObject(size, usage=pyglet.gl.GL_STREAM_READ) for _ in range(slots)]
+        self.fences = [None] * slots
+        self.lengths = [0] * slots
+        self.tags = [None] * slots
+        self.next_slot = 0
+        self.tag = None # tag of the copy poll() returned last
+
+    def request(self, source, offset=0, length=None, tag=None, rows=1, stride=0):
+        # With rows > 1, rows pieces of length bytes that start stride bytes apart are copied back to back,
+        # so a rectangle of a board is read back without the rest of its rows.
+        length = self.size // rows if length is None else length
+
+        slot = self.next_slot
+        if self.fences[slot] is not None: # every staging buffer is still in flight, skip this one
+            return False
+
+        glBindBuffer(GL_COPY_READ_BUFFER, source.id)
+        glBindBuffer(GL_COPY_WRITE_BUFFER, self.staging[slot].id)
+        for row in range(rows):
+            glCopyBufferSubData(GL_COPY_READ_BUFFER, GL_COPY_WRITE_BUFFER, offset + row * stride, row * length, length)
+
+        self.fences[slot] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        self.lengths[slot] = length * rows
+        self.tags[slot] = tag
+        self.next_slot = (slot + 1) % len(self.staging)
+
+        return True
+
+    def poll(self):
+        # Newest finished copy as bytes, or None if nothing finished since the last poll.
+        latest = None
+
+        for offset in range(len(self.staging)): # oldest first, next_slot is the oldest copy in flight
+            slot = (self.next_slot + offset) % len(self.staging)
+            fence = self.fences[slot]
+            if fence is None:
+                continue
+
+            if glClientWaitSync(fence, 0, 0) not in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED):
+                continue
+
+            glDeleteSync(fence)
+            self.fences[slot] = None
+
+            data = (ctypes.c_ubyte * self.lengths[slot])()
+            glBindBuffer(GL_COPY_READ_BUFFER, self.staging[slot].id)
+            glGetBufferSubData(GL_COPY_READ_BUFFER, 0, self.lengths[slot], data)
+            latest = bytes(data)
+            self.tag = self.tags[slot]
+
+        return latest
+
+    def pending(self):
+        return any(fence is not None for fence in self.fences)
+
+    def delete(self):
+        for fence in self.fences:
+            if fence is not None:
+                glDeleteSync(fence)
+
+        for buffer in self.staging:
+            buffer.delete()
@@ -0,0 +1,360 @@
+import numpy as np
+
+from array import array
+from collections import OrderedDict
+
+from game.cpu_engine import cells_to_rgba
+from game.rules import LIFE, NEIGHBOR_OFFSETS
+
+class Node:
+    __slots__ = ("level", "nw", "ne", "sw", "se", "population", "digest")
+
+    def __init__(self, level, nw, ne, sw, se, population):
+        self.level = level
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.population = population
+        self.digest = None # see node_digest
+
+def node_digest(node):
+    # Hash of the cells below node, computed once per node and only when asked for. Unlike the node itself it
+    # stays the same when collect() drops the node and the same cells are built again as a new one.
+    if node.digest is None:
+        node.digest = node.population if node.level == 0 else hash((node_digest(node.nw), node_digest(node.ne), node_digest(node.sw), node_digest(node.se)))
+    return node.digest
+
+class HashLife:
+    # Quadtree universe on an unbounded plane, rows grow downwards in nw/ne/sw/se terms.
+    # Nodes are canonicalized, so equal subtrees are the same object and RESULTs can be memoized per node.
+    # Two state rules without B0 only, an empty node has to stay empty.
+    def __init__(self, positions=(), max_nodes=2_000_000, max_results=1_000_000, rule=LIFE):
+        self.rule = rule
+        self.table = rule.table.tolist()
+        self.max_nodes = max_nodes
+        self.max_results = max_results
+
+        self.nodes = {}
+        self.results = OrderedDict() # (node, j) -> centre of node advanced 2^j generations, least recently used first
+        self.empty_nodes = []
+
+        self.dead = Node(0, None, None, None, None, 0)
+        self.alive = Node(0, None, None, None, None, 1)
+
+        self.generation = 0
+        self.set_cells(positions)
+
+    def join(self, nw, ne, sw, se):
+        key = (nw, ne, sw, se)
+        node = self.nodes.get(key)
+        if node is None:
+            node = Node(nw.level + 1, nw, ne, sw, se, nw.population + ne.population + sw.population + se.population)
+            self.nodes[key] = node
+        return node
+
+    def empty(self, level):
+        while len(self.empty_nodes) <= level:
+            if not self.empty_nodes:
+                self.empty_nodes.append(self.dead)
+            else:
+                child = self.empty_nodes[-1]
+                self.empty_nodes.append(self.join(child, child, child, child))
+        return self.empty_nodes[level]
+
+    def centre(self, node):
+        # Same node in the middle of a twice as large empty one.
+        empty = self.empty(node.level - 1)
+        return self.join(
+            self.join(empty, empty, empty, node.nw),
+            self.join(empty, empty, node.ne, empty),
+            self.join(empty, node.sw, empty, empty),
+            self.join(node.se, empty, empty, empty),
+        )
+
+    def set_cells(self, positions):
+        self.root, self.origin = self.build(positions)
+
+    def build(self, positions):
+        positions = list(positions)
+        if not positions:
+            return self.empty(3), (0, 0)
+
+        min_row = min(row for row, _ in positions)
+        min_col = min(col for _, col in positions)
+        extent = max(max(row - min_row, col - min_col) for row, col in positions) + 1
+
+        level = max(3, (extent - 1).bit_length())
+        layer = {(row - min_row, col - min_col): self.alive for row, col in positions}
+
+        # Merge 2x2 blocks bottom-up, missing quadrants are empty nodes of the child level.
+        for child_level in range(level):
+            empty = self.empty(child_level)
+            parents = {}
+            for (row, col), node in layer.items():
+                quadrants = parents.setdefault((row >> 1, col >> 1), [empty, empty, empty, empty])
+                quadrants[(row & 1) * 2 + (col & 1)] = node
+            layer = {key: self.join(*quadrants) for key, quadrants in parents.items()}
+
+        return layer[(0, 0)], (min_row, min_col)
+
+    def node_from_cells(self, cells):
+        # Node for a square 2D array whose side is a power of two.
+        if len(cells) == 1:
+            return self.alive if cells[0][0] else self.dead
+
+        half = len(cells) // 2
+        return self.join(
+            self.node_from_cells(cells[:half, :half]), self.node_from_cells(cells[:half, half:]),
+            self.node_from_cells(cells[half:, :half]), self.node_from_cells(cells[half:, half:]),
+        )
+
+    def base_step(self, node):
+        # One generation of the centre 2x2 of a 4x4 node.
+        quadrants = (node.nw, node.ne, node.sw, node.se)
+        bits = [[0] * 4 for _ in range(4)]
+        for index, quadrant in enumerate(quadrants):
+            row, col = (index // 2) * 2, (index % 2) * 2
+            bits[row][col] = quadrant.nw.population
+            bits[row][col + 1] = quadrant.ne.population
+            bits[row + 1][col] = quadrant.sw.population
+            bits[row + 1][col + 1] = quadrant.se.population
+
+        next_cells = []
+        for row in (1, 2):
+            for col in (1, 2):
+                neighborhood = bits[row][col] << 8
+                for bit, (dy, dx) in enumerate(NEIGHBOR_OFFSETS):
+                    neighborhood |= bits[row + dy][col + dx] << bit
+                next_cells.append(self.alive if self.table[neighborhood] else self.dead)
+
+        return self.join(*next_cells)
+
+    def result(self, node, j):
+        # Centre half of node advanced 2^j generations, j <= node.level - 2.
+        if node.population == 0:
+            return self.empty(node.level - 1)
+
+        key = (node, j)
+        cached = self.results.get(key)
+        if cached is not None:
+            self.results.move_to_end(key)
+            return cached
+
+        if node.level == 2:
+            next_node = self.base_step(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            sub_j = min(j, node.level - 3)
+
+            c1 = self.result(nw, sub_j)
+            c2 = self.result(self.join(nw.ne, ne.nw, nw.se, ne.sw), sub_j)
+            c3 = self.result(ne, sub_j)
+            c4 = self.result(self.join(nw.sw, nw.se, sw.nw, sw.ne), sub_j)
+            c5 = self.result(self.join(nw.se, ne.sw, sw.ne, se.nw), sub_j)
+            c6 = self.result(self.join(ne.sw, ne.se, se.nw, se.ne), sub_j)
+            c7 = self.result(sw, sub_j)
+            c8 = self.result(self.join(sw.ne, se.nw, sw.se, se.sw), sub_j)
+            c9 = self.result(se, sub_j)
+
+            if j < node.level - 2:
+                # The first round already covered 2^j generations, only take the centres.
+                next_node = self.join(
+                    self.join(c1.se, c2.sw, c4.ne, c5.nw),
+                    self.join(c2.se, c3.sw, c5.ne, c6.nw),
+                    self.join(c4.se, c5.sw, c7.ne, c8.nw),
+                    self.join(c5.se, c6.sw, c8.ne, c9.nw),
+                )
+            else:
+                next_node = self.join(
+                    self.result(self.join(c1, c2, c4, c5), sub_j),
+                    self.result(self.join(c2, c3, c5, c6), sub_j),
+                    self.result(self.join(c4, c5, c7, c8), sub_j),
+                    self.result(self.join(c5, c6, c8, c9), sub_j),
+                )
+
+        self.results[key] = next_node
+        if len(self.results) > self.max_results:
+            self.results.popitem(last=False)
+
+        return next_node
+
+    def advance(self, k):
+        # Fast-forward exactly 2^k generations.
+        root, (row, col) = self.root, self.origin
+
+        while root.level < k + 2:
+            half = 1 << (root.level - 1)
+            root, row, col = self.centre(root), row - half, col - half
+
+        # Two more levels of padding so nothing can leave the result at the speed of light.
+        for _ in range(2):
+            half = 1 << (root.level - 1)
+            root, row, col = self.centre(root), row - half, col - half
+
+        quarter = 1 << (root.level - 2)
+        self.root, self.origin = self.result(root, k), (row + quarter, col + quarter)
+        self.generation += 1 << k
+
+        self.trim()
+
+        if len(self.nodes) > self.max_nodes:
+            self.collect()
+
+    def step(self, generations=1):
+        k = 0
+        while generations:
+            if generations & 1:
+                self.advance(k)
+            generations >>= 1
+            k += 1
+
+    def trim(self):
+        # Drop empty borders so the root stays as small as the pattern allows.
+        while self.root.level > 3:
+            root = self.root
+            inner = self.join(root.nw.se, root.ne.sw, root.sw.ne, root.se.nw)
+            if inner.population != root.population:
+                break
+
+            quarter = 1 << (root.level - 2)
+            self.root = inner
+            self.origin = (self.origin[0] + quarter, self.origin[1] + quarter)
+
+    def collect(self):
+        # Mark everything reachable from the root and drop the rest, the result cache goes with it
+        # because its entries keep otherwise unreachable nodes alive.
+        self.results.clear()
+        self.empty_nodes.clear()
+
+        reachable = {}
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key in reachable:
+                continue
+
+            reachable[key] = node
+            stack.extend(key)
+
+        self.nodes = reachable
+
+    def set_cell(self, row, col, value):
+        root, (origin_row, origin_col) = self.root, self.origin
+
+        while not (origin_row <= row < origin_row + (1 << root.level) and origin_col <= col < origin_col + (1 << root.level)):
+            half = 1 << (root.level - 1)
+            root, origin_row, origin_col = self.centre(root), origin_row - half, origin_col - half
+
+        self.root, self.origin = self.set_node_cell(root, row - origin_row, col - origin_col, value), (origin_row, origin_col)
+
+    def set_node_cell(self, node, row, col, value):
+        if node.level == 0:
+            return self.alive if value else self.dead
+
+        half = 1 << (node.level - 1)
+        quadrants = [node.nw, node.ne, node.sw, node.se]
+        index = (row >= half) * 2 + (col >= half)
+        quadrants[index] = self.set_node_cell(quadrants[index], row % half, col % half, value)
+
+        return self.join(*quadrants)
+
+    @property
+    def population(self):
+        return self.root.population
+
+    def cells(self):
+        positions = []
+        stack = [(self.root, self.origin[0], self.origin[1])]
+
+        while stack:
+            node, row, col = stack.pop()
+            if node.population == 0:
+                continue
+            if node.level == 0:
+                positions.append((row, col))
+                continue
+
+            half = 1 << (node.level - 1)
+            stack.append((node.nw, row, col))
+            stack.append((node.ne, row, col + half))
+            stack.append((node.sw, row + half, col))
+            stack.append((node.se, row + half, col + half))
+
+        return positions
+
+    def window(self, top, left, rows, cols):
+        # Rasterise the part of the plane starting at (top, left), skipping subtrees outside of it.
+        cells = np.zeros((rows, cols), dtype=np.uint8)
+        stack = [(self.root, self.origin[0], self.origin[1])]
+
+        while stack:
+            node, row, col = stack.pop()
+            size = 1 << node.level
+            if node.population == 0 or row >= top + rows or col >= left + cols or row + size <= top or col + size <= left:
+                continue
+            if node.level == 0:
+                cells[row - top, col - left] = 1
+                continue
+
+            half = size >> 1
+            stack.append((node.nw, row, col))
+            stack.append((node.ne, row, col + half))
+            stack.append((node.sw, row + half, col))
+            stack.append((node.se, row + half, col + half))
+
+        return cells
+
+class HashLifeEngine:
+    # Board-sized window over a HashLife universe, (view_row, view_col) is the top left cell in view.
+    # The universe itself is unbounded, so cells that leave the board keep evolving and can come back.
+    def __init__(self, rows, cols, grid=None, rule=LIFE):
+        self.rows = rows
+        self.cols = cols
+        self.view_row = 0
+        self.view_col = 0
+        self.universe = HashLife(rule=rule)
+
+        if grid is not None:
+            self.load(grid)
+
+    def load(self, grid):
+        cells = np.asarray(grid).reshape(self.rows, self.cols)
+        self.load_positions((row + self.view_row, col + self.view_col) for row, col in np.argwhere(cells).tolist())
+
+    def load_positions(self, positions):
+        self.universe.set_cells(positions)
+
+    def set_cell(self, row, col, value):
+        self.universe.set_cell(row + self.view_row, col + self.view_col, value)
+
+    def set_cells(self, rows, cols, values):
+        for row, col, value in zip(rows.tolist(), cols.tolist(), values.tolist()):
+            self.set_cell(row, col, value)
+
+    def step(self, generations=1):
+        self.universe.step(generations)
+
+    def advance(self, k):
+        self.universe.advance(k)
+
+    def population(self):
+        return self.universe.population
+
+    def state_key(self):
+        # By content, node objects are only canonical until the next collect().
+        root = self.universe.root
+        return node_digest(root), root.level, root.population, self.universe.origin
+
+    def to_cells(self):
+        return self.universe.window(self.view_row, self.view_col, self.rows, self.cols)
+
+    def to_array(self):
+        return array('i', self.to_cells().astype(np.int32).tobytes())
+
+    def to_rgba(self):
+        return cells_to_rgba(self.to_cells())
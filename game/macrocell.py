@@ -0,0 +1,118 @@
+import numpy as np
+
+from game.hashlife import HashLife
+from game.rules import LIFE
+
+# Golly's Macrocell format: one line per distinct quadtree node, children referenced by line number and 0 for
+# an empty child. 8x8 leaves are written as rows of "." and "*" ended by "$", bigger nodes as "level nw ne sw se".
+MACROCELL_EXTENSION = ".mc"
+LEAF_LEVEL = 3
+
+def read_leaf(line):
+    cells = np.zeros((8, 8), dtype=np.uint8)
+    row = col = 0
+    for char in line:
+        if char == "$":
+            row, col = row + 1, 0
+        else:
+            if char == "*":
+                cells[row, col] = 1
+            col += 1
+
+    return cells
+
+def read_macrocell(file, rule=LIFE):
+    # Builds the pattern straight into a HashLife universe, so shared subtrees are only ever stored once.
+    # The "#R" line is left to the caller (see load_rule), which knows what to do with rules it can't run.
+    universe = HashLife(rule=rule)
+    nodes = [None] # 1-based, 0 is the empty node of whatever level refers to it
+    leaves = {}
+
+    for line in file:
+        line = line.strip()
+        if not line or line.startswith("["):
+            continue
+
+        if line.startswith("#"):
+            if line.startswith("#G"):
+                universe.generation = int(line[2:])
+            continue
+
+        if line[0] in ".*$":
+            if line not in leaves:
+                leaves[line] = universe.node_from_cells(read_leaf(line))
+            nodes.append(leaves[line])
+            continue
+
+        level, *children = map(int, line.split())
+        if level == 1: # children are cell states
+            nodes.append(universe.join(*(universe.alive if state else universe.dead for state in children)))
+        else:
+            nodes.append(universe.join(*(nodes[child] if child else universe.empty(level - 1) for child in children)))
+
+    root = nodes[-1] if len(nodes) > 1 else universe.empty(LEAF_LEVEL)
+    half = 1 << (root.level - 1)
+    universe.root, universe.origin = root, (-half, -half)
+    universe.trim()
+
+    return universe
+
+def load_macrocell(file_path, rule=LIFE):
+    with open(file_path, "r") as file:
+        return read_macrocell(file, rule)
+
+def centre_window(universe, rows, cols):
+    # Top left cell of a rows x cols window centred on the universe.
+    half = 1 << (universe.root.level - 1)
+    return universe.origin[0] + half - rows // 2, universe.origin[1] + half - cols // 2
+
+def leaf_line(node):
+    cells = np.zeros((8, 8), dtype=np.uint8)
+    stack = [(node, 0, 0)]
+    while stack:
+        node, row, col = stack.pop()
+        if node.population == 0:
+            continue
+        if node.level == 0:
+            cells[row, col] = 1
+            continue
+
+        half = 1 << (node.level - 1)
+        stack.extend(((node.nw, row, col), (node.ne, row, col + half), (node.sw, row + half, col), (node.se, row + half, col + half)))
+
+    rows = ["".join(".*"[cell] for cell in row).rstrip(".") for row in cells.tolist()]
+    while rows and not rows[-1]:
+        rows.pop()
+
+    return "".join(row + "$" for row in rows)
+
+def write_macrocell(file, universe, rule=None):
+    # Every distinct non-empty node once, children before their parents.
+    file.write("[M2] (csd4ni3l's Game Of Life viewer)\n")
+    file.write(f"#R {rule or universe.rule}\n")
+    if universe.generation:
+        file.write(f"#G {universe.generation}\n")
+
+    root = universe.root
+    if root.population == 0:
+        file.write("$\n")
+        return
+
+    numbers = {}
+    stack = [(root, False)]
+    while stack:
+        node, children_written = stack.pop()
+        if node.population == 0 or node in numbers:
+            continue
+
+        if node.level == LEAF_LEVEL:
+            file.write(leaf_line(node) + "\n")
+        elif children_written:
+            children = " ".join(str(numbers.get(child, 0)) for child in (node.nw, node.ne, node.sw, node.se))
+            file.write(f"{node.level} {children}\n")
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in (node.se, node.sw, node.ne, node.nw))
+            continue
+
+        numbers[node] = len(numbers) + 1
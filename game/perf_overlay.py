@@ -0,0 +1,87 @@
+import csv, ctypes, time
+
+import numpy as np
+
+from collections import deque
+from contextlib import contextmanager
+from pyglet.gl import glGenQueries, glDeleteQueries, glBeginQuery, glEndQuery, glGetQueryObjectiv, glGetQueryObjectui64v, GLint, GLuint, GLuint64, GL_TIME_ELAPSED, GL_QUERY_RESULT, GL_QUERY_RESULT_AVAILABLE
+
+class PerfStats:
+    # Rolling per-phase timings in milliseconds, the last window samples of each phase are kept.
+    def __init__(self, window=600):
+        self.window = window
+        self.samples = {}
+        self.log = deque(maxlen=window * 8) # (frame, phase, milliseconds) for the CSV dump
+        self.frame = 0
+
+    def record(self, phase, milliseconds):
+        self.samples.setdefault(phase, deque(maxlen=self.window)).append(milliseconds)
+        self.log.append((self.frame, phase, milliseconds))
+
+    def next_frame(self):
+        self.frame += 1
+
+    @contextmanager
+    def measure(self, phase):
+        start = time.perf_counter()
+        yield
+        self.record(phase, (time.perf_counter() - start) * 1000)
+
+    def summary(self):
+        lines = []
+        for phase, values in self.samples.items():
+            values = np.fromiter(values, dtype=np.float64)
+            lines.append(f"{phase}: min {values.min():.2f} / mean {values.mean():.2f} / p99 {np.percentile(values, 99):.2f} ms")
+
+        return "\n".join(lines)
+
+    def dump_csv(self, file_path):
+        with open(file_path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame", "phase", "milliseconds"])
+            writer.writerows(self.log)
+
+class GpuTimer:
+    # GL_TIME_ELAPSED queries in a ring. Results are only read once the GPU reports them available,
+    # so timing never stalls the frame, begin() is skipped while every query is still in flight.
+    def __init__(self, slots=4):
+        self.queries = (GLuint * slots)()
+        glGenQueries(slots, self.queries)
+
+        self.free = list(self.queries)
+        self.pending = deque()
+        self.active = None
+
+    def begin(self):
+        if not self.free or self.active is not None:
+            return
+
+        self.active = self.free.pop()
+        glBeginQuery(GL_TIME_ELAPSED, self.active)
+
+    def end(self):
+        if self.active is None:
+            return
+
+        glEndQuery(GL_TIME_ELAPSED)
+        self.pending.append(self.active)
+        self.active = None
+
+    def poll(self):
+        # Milliseconds of every query that finished since the last poll, oldest first.
+        results = []
+        while self.pending:
+            available = GLint()
+            glGetQueryObjectiv(self.pending[0], GL_QUERY_RESULT_AVAILABLE, ctypes.byref(available))
+            if not available.value:
+                break
+
+            elapsed = GLuint64()
+            glGetQueryObjectui64v(self.pending[0], GL_QUERY_RESULT, ctypes.byref(elapsed))
+            results.append(elapsed.value / 1e6)
+            self.free.append(self.pending.popleft())
+
+        return results
+
+    def delete(self):
+        glDeleteQueries(len(self.queries), self.queries)
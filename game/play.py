@@ -1,14 +1,30 @@
-import arcade, arcade.gui, pyglet, time, json, os
+import arcade, arcade.gui, pyglet, time, json, os, struct, math
+import numpy as np
 
-from pyglet.gl import glBindBufferBase, GL_SHADER_STORAGE_BUFFER
+from pyglet.gl import glFinish
 
-from array import array
-
-from utils.constants import COLS, ROWS, button_style
+from utils.constants import COLS, ROWS, MAX_COLS, MAX_ROWS, button_style, log_dir
 from utils.preload import create_sound, destroy_sound, button_texture, button_hovered_texture, cursor_texture
 
-from game.game_of_life import create_shader
-from game.file_support import load_file
+from game.game_of_life import create_shader, create_packed_shader, create_stats_buffer, create_edit_buffer, create_rule_buffer, create_history_buffer, create_texture, get_shader_program, get_edit_shader_source, get_packed_edit_shader_source, get_history_pack_shader_source, dispatch_groups, dispatch_generations, STATS_FORMAT, stats_reset
+from game.gpu_readback import AsyncReadback
+from game.active_tiles import ActiveTiles
+from game.camera import Camera, DensityPyramid
+from game.backends import CPU_BACKENDS, UNBOUNDED_BACKENDS, backend_for_rule
+from game.bitpacked import BitPackedEngine, pack, pack_positions, place_words, unpack, word_count, edit_masks
+from game.edit_queue import EditQueue
+from game.hashlife import HashLife, HashLifeEngine
+from game.sparse_engine import SparseEngine
+from game.file_support import LIFE_EXTENSIONS, load_file, load_rule, read_rle, cells_from_positions
+from game.snapshot import SNAPSHOT_EXTENSION, load_snapshot
+from game.macrocell import MACROCELL_EXTENSION, load_macrocell, centre_window
+from game.soup_search import random_soup
+from game.perf_overlay import PerfStats, GpuTimer
+from game.cycle_detection import CycleDetector
+from game.rules import LIFE_RULE, parse_rule
+from game.rewind import RewindHistory, state_planes, pack_planes, unpack_planes
+
+BOARD_OBJECTS = ("ssbo_in", "ssbo_out", "stats_buffer", "stats_readback", "edit_buffer", "gpu_timer", "rule_buffer", "tiles", "history_readback", "history_buffer", "grid_readback", "game_of_life_image", "density", "image_sprite", "grid_outline")
 
 class Game(arcade.gui.UIView):
     def __init__(self, pypresence_client=None, generation=None, running=False, cell_grid=None, gps=60, load_from=None):
@@ -16,6 +32,7 @@ class Game(arcade.gui.UIView):
 
         self.generation = generation or 0
         self.population = 0
+        self.bounding_box = None # (min_row, min_col, max_row, max_col) of the live cells, None if there are none
         self.running = running or False
         self.cell_grid = cell_grid
         self.load_from = load_from
@@ -33,20 +50,70 @@ class Game(arcade.gui.UIView):
         self.controller_a_press = False
         self.controller_b_press = False
 
-        self.mouse_row = 0
-        self.mouse_col = 0
         self.mouse_interaction = -1
 
+        # Drawing is queued here during the frame and applied in one batch, independent of the generation tick.
+        self.edit_queue = EditQueue()
+        self.last_edit_cell = None
+        self.rectangle_start = None
+        self.rectangle_end = None
+        self.rectangle_value = 1
+
+        self.jump_exponent = 10
+        # Jumps HashLife can't compute are stepped on the board a batch per frame, tuned like turbo.
+        self.jump_pending = 0
+        self.jump_batch = 1
+
+        # Turbo mode runs several generations per frame and only renders the last one,
+        # the count is tuned every frame so a batch takes about turbo_budget seconds.
+        self.turbo = False
+        self.turbo_generations = 1
+
+        self.save_state = None
+
+        # GL objects of the current game, see delete_board
+        for name in BOARD_OBJECTS:
+            setattr(self, name, None)
+
+        # Per-phase frame timings, F3 shows them and F4 writes them to a CSV in the log directory.
+        self.perf = PerfStats()
+        self.perf_visible = False
+
         self.pypresence_client = pypresence_client
 
         with open("settings.json", "r") as file:
             self.settings_dict = json.load(file)
 
+        self.backend = self.settings_dict.get("backend", "GPU")
+        self.rule = parse_rule(self.settings_dict.get("rule", LIFE_RULE))
+        self.cols, self.rows = map(int, self.settings_dict.get("grid_size", f"{COLS}x{ROWS}").split("x"))
+        self.workgroup_size = tuple(map(int, self.settings_dict.get("workgroup_size", "16x16").split("x")))
+        self.turbo_budget = self.settings_dict.get("turbo_budget", 8) / 1000
+        self.brush_size = int(self.settings_dict.get("brush_size", 1))
+        self.brush_shape = self.settings_dict.get("brush_shape", "Square")
+        self.engine = None
+
+        # Settled parts of the board are skipped by the tiled shader, only for the GPU backend with workgroups bigger than a cell.
+        self.active_tiles = self.settings_dict.get("active_tiles", True)
+
+        # Sampled board states, once one repeats the period is shown and the game pauses or stops computing.
+        self.cycle_detector = CycleDetector()
+        self.cycle_action = self.settings_dict.get("cycle_action", "Report")
+
+        # Compressed board states of the last generations, left / right arrow steps through them. Only every
+        # rewind_interval-th generation is recorded, the ones in between are replayed from the one before them.
+        self.history = RewindHistory(self.settings_dict.get("rewind_memory", 64) * 1024 * 1024)
+        self.history_interval = int(self.settings_dict.get("rewind_interval", 16))
+
         arcade.schedule(self.update_generation, 1 / self.gps)
 
     def on_show_view(self):
         super().on_show_view()
 
+        if hasattr(self, "anchor"): # back from stamping a pattern, the board is still running
+            self.reschedule()
+            return
+
         self.setup_game(load_existing=self.cell_grid is not None)
 
         self.anchor = self.add_widget(arcade.gui.UIAnchorLayout(size_hint=(1, 1)))
@@ -64,6 +131,15 @@ class Game(arcade.gui.UIView):
         self.actual_fps_label = arcade.gui.UILabel(text=f"Actual generations/second: 0", font_name="Roboto", font_size=16)
         self.info_box.add(self.actual_fps_label)
 
+        self.jump_label = arcade.gui.UILabel(text=f"Jump (H): 2^{self.jump_exponent}", font_name="Roboto", font_size=16)
+        self.info_box.add(self.jump_label)
+
+        self.cycle_label = arcade.gui.UILabel(text="Cycle: none", font_name="Roboto", font_size=16)
+        self.info_box.add(self.cycle_label)
+
+        self.perf_label = self.anchor.add(arcade.gui.UILabel(text="", font_name="Roboto", font_size=12, multiline=True, width=520), anchor_x="left", anchor_y="top", align_x=5, align_y=-40)
+        self.perf_label.visible = self.perf_visible
+
         self.back_button = arcade.gui.UITextureButton(texture=button_texture, texture_hovered=button_hovered_texture, text='<--', style=button_style, width=100, height=50)
         self.back_button.on_click = lambda event: self.main_exit()
         self.anchor.add(self.back_button, anchor_x="left", anchor_y="top", align_x=5, align_y=-5)
@@ -72,6 +148,10 @@ class Game(arcade.gui.UIView):
         self.load_button.on_click = lambda event: self.load()
         self.anchor.add(self.load_button, anchor_x="left", anchor_y="bottom", align_x=5, align_y=5)
 
+        self.stamp_button = arcade.gui.UITextureButton(texture=button_texture, texture_hovered=button_hovered_texture, text="Stamp", style=button_style, width=200, height=100)
+        self.stamp_button.on_click = lambda event: self.stamp()
+        self.anchor.add(self.stamp_button, anchor_x="left", anchor_y="bottom", align_x=210, align_y=5)
+
         self.save_button = arcade.gui.UITextureButton(texture=button_texture, texture_hovered=button_hovered_texture, text="Save", style=button_style, width=200, height=100)
         self.save_button.on_click = lambda event: self.save()
         self.anchor.add(self.save_button, anchor_x="right", anchor_y="bottom", align_x=-5, align_y=5)
@@ -88,13 +168,22 @@ class Game(arcade.gui.UIView):
     def main_exit(self):
         arcade.unschedule(self.update_generation)
         
-        self.shader_program.delete()
-        self.ssbo_in.delete()
-        self.ssbo_out.delete()
+        self.delete_board()
 
         from menus.main import Main
         self.window.show_view(Main(self.pypresence_client))
 
+    def delete_board(self):
+        # Releases the GL objects of the current game, setup_game builds new ones for every game.
+        # Shader programs stay in the cache for the next game.
+        for name in BOARD_OBJECTS:
+            board_object = getattr(self, name)
+            if board_object is not None:
+                board_object.delete()
+                setattr(self, name, None)
+
+        self.save_state = None # a save in flight reads from the deleted buffers
+
     def on_trigger_motion(self, controller, name, value):
         if not value >= 0.9:
             return
@@ -119,45 +208,256 @@ class Game(arcade.gui.UIView):
             self.mouse_interaction = -1
 
     def setup_game(self, load_existing=False, randomized=False):
-        self.grid = array('i', [0] * ROWS * COLS)
-
-        if self.load_from:
-            loaded_positions = load_file(COLS / 2, ROWS / 2, self.load_from)
-            
-            for row, col in loaded_positions:
-                index = (row * COLS) + col
-                self.grid[index] = 1
-
-        self.shader_program, self.game_of_life_image, self.ssbo_in, self.ssbo_out = create_shader(self.grid)
+        self.delete_board()
+        self.cycle_detector.reset()
+        self.jump_pending = 0
+
+        if self.load_from: # patterns run under the rule they were saved with
+            self.rule = self.file_rule(self.load_from)
+        self.backend = backend_for_rule(self.backend, self.rule)
+
+        loaded_positions, snapshot_words, rle_words, universe = np.zeros((0, 2), dtype=np.int64), None, None, None
+        if randomized: # a fresh unseeded soup over the whole board
+            loaded_positions = np.argwhere(random_soup(None, (self.rows, self.cols), self.settings_dict.get("soup_density", 50) / 100))
+        elif self.load_from and self.load_from.endswith(SNAPSHOT_EXTENSION):
+            loaded_positions, snapshot_words = self.restore_snapshot(self.load_from)
+        elif self.load_from and self.load_from.endswith(MACROCELL_EXTENSION):
+            loaded_positions, universe = self.restore_macrocell(self.load_from)
+        elif self.load_from and self.load_from.endswith(".rle"):
+            loaded_positions, rle_words = self.restore_rle(self.load_from)
+        elif self.load_from:
+            loaded_positions = self.fit_pattern(load_file(0, 0, self.load_from))
+        elif load_existing: # board that was exported when leaving for the file manager
+            loaded_positions = self.fit_pattern(np.argwhere(self.cell_grid))
+
+        # bounded backends can't hold cells outside of the board
+        inside = (loaded_positions[:, 0] >= 0) & (loaded_positions[:, 0] < self.rows) & (loaded_positions[:, 1] >= 0) & (loaded_positions[:, 1] < self.cols)
+        board_positions = loaded_positions[inside]
+
+        # Pattern cells are written straight into one preallocated buffer instead of going through Python lists.
+        # GPU Bit-Packed builds its words from the positions or the file instead.
+        self.grid = None
+        if self.backend != "GPU Bit-Packed":
+            self.grid = np.zeros(self.rows * self.cols, dtype=np.int32)
+            self.grid[board_positions[:, 0] * self.cols + board_positions[:, 1]] = 1
+
+        self.density = DensityPyramid(self.rows, self.cols)
+
+        if self.backend in CPU_BACKENDS:
+            self.engine = CPU_BACKENDS[self.backend](self.rows, self.cols, self.grid, self.rule)
+            if universe is not None: # the whole Macrocell tree, not just the part in view
+                self.engine.universe = universe
+                self.engine.view_row, self.engine.view_col = centre_window(universe, self.rows, self.cols)
+            elif self.backend in UNBOUNDED_BACKENDS:
+                self.engine.load_positions(loaded_positions.tolist())
+            self.game_of_life_image = create_texture(self.rows, self.cols)
+            self.upload_engine_image()
+        elif self.backend == "GPU Bit-Packed":
+            self.engine = None
+            if snapshot_words is not None:
+                words = snapshot_words
+            elif rle_words is not None:
+                words = rle_words
+            else:
+                words = pack_positions(board_positions, self.rows, self.cols, 32)
+            self.shader_program, self.game_of_life_image, self.ssbo_in, self.ssbo_out = create_packed_shader(words, self.rows, self.cols)
+
+            if snapshot_words is None:
+                self.upload_rows(words, np.flatnonzero(words.any(axis=1)))
+            else: # already in the shader's layout, uploaded straight from the memory-mapped file
+                self.ssbo_in.set_data(snapshot_words.ctypes.data)
+            self.create_gpu_buffers()
+        else:
+            self.engine = None
+            active = self.active_tiles and self.workgroup_size != (1, 1)
+            self.shader_program, self.game_of_life_image, self.ssbo_in, self.ssbo_out = create_shader(self.grid, self.rows, self.cols, self.workgroup_size, active)
 
-        self.ssbo_in.set_data(self.grid.tobytes())
+            self.upload_rows(self.grid.reshape(self.rows, self.cols), board_positions[:, 0])
+            self.create_gpu_buffers()
+            self.tiles = ActiveTiles(self.rows, self.cols, self.workgroup_size) if active else None
 
+        # The board fits into 75% of the window, scrolling zooms in and out and middle-dragging pans.
+        self.camera = Camera(self.rows, self.cols, self.window.width * 0.75, self.window.height * 0.75, self.window.width / 2, self.window.height / 2)
         self.image_sprite = pyglet.sprite.Sprite(img=self.game_of_life_image)
-        
-        scale_x = (self.window.width * 0.75) / self.image_sprite.width
-        scale_y = (self.window.height * 0.75) / self.image_sprite.height
-        rendered_width = self.image_sprite.width * scale_x
-        rendered_height = self.image_sprite.height * scale_y
-
-        self.image_sprite.scale_x = scale_x 
-        self.image_sprite.scale_y = scale_y
-        self.image_sprite.x = (self.window.width / 2) - (rendered_width / 2)
-        self.image_sprite.y = (self.window.height / 2) - (rendered_height / 2)
 
         self.grid_outline = pyglet.shapes.BorderedRectangle(
-            x=self.image_sprite.x - 3,
-            y=self.image_sprite.y - 3,
-            width=rendered_width + 5,
-            height=rendered_height + 5,
+            x=self.camera.x - 3,
+            y=self.camera.y - 3,
+            width=self.camera.width + 5,
+            height=self.camera.height + 5,
             color=(47, 79, 79, 255),
             border_color=(255, 255, 255, 255),
             border=5
         )
 
-    def update_generation(self, delta_time):
+        self.history.clear()
+        self.history_planes = state_planes(self.rule.states)
+        if self.engine is None and self.history.memory_cap:
+            # The GPU backend packs the board into history_buffer first, GPU Bit-Packed is read back as it is.
+            # One staging buffer, a record is skipped while the last one is still in flight.
+            if self.backend == "GPU":
+                self.history_buffer = create_history_buffer(self.rows, self.cols, self.history_planes)
+            self.history_readback = AsyncReadback((self.ssbo_in if self.history_buffer is None else self.history_buffer).size, slots=1)
+        self.record_history()
+
+    def file_rule(self, file_path):
+        try:
+            return parse_rule(load_rule(file_path) or str(self.rule))
+        except ValueError: # a rule this game can't run, the pattern still loads under the current one
+            return self.rule
+
+    def restore_snapshot(self, file_path):
+        # Restores the generation and speed, growing a bounded board to the snapshot's size and centring smaller snapshots.
+        # Returns the live positions, or the words themselves when they can be uploaded as they are.
+        header, words = load_snapshot(file_path)
+        self.generation, self.gps = header["generation"], header["gps"]
+
+        if self.backend not in UNBOUNDED_BACKENDS:
+            self.rows, self.cols = max(self.rows, header["rows"]), max(self.cols, header["cols"])
+
+        if self.backend == "GPU Bit-Packed" and (self.rows, self.cols) == (header["rows"], header["cols"]):
+            return np.zeros((0, 2), dtype=np.int64), words
+
+        offset = ((self.rows - header["rows"]) // 2, (self.cols - header["cols"]) // 2)
+        return np.argwhere(unpack(words, header["cols"])) + offset, None
+
+    def restore_macrocell(self, file_path):
+        # HashLife takes the tree as it is, other backends get the board-sized window in its centre.
+        # Returns the live positions, or the universe for HashLife.
+        try:
+            universe = load_macrocell(file_path, self.rule) # already the file's rule if this game can run it, see file_rule
+        except ValueError: # a broken node line, starts on an empty board like an unreadable pattern
+            return np.zeros((0, 2), dtype=np.int64), None
+        self.generation = universe.generation
+
+        if self.backend == "HashLife":
+            return np.zeros((0, 2), dtype=np.int64), universe
+
+        size = 1 << universe.root.level
+        if size <= max(self.rows, self.cols): # small enough to be placed like any other pattern
+            return self.fit_pattern(universe.cells()), None
+
+        top, left = centre_window(universe, self.rows, self.cols)
+        return np.argwhere(universe.window(top, left, self.rows, self.cols)), None
+
+    def restore_rle(self, file_path):
+        # GPU Bit-Packed places the packed rows of the file on the board as they are, without unpacking them.
+        # Returns the live positions, or the board's words for GPU Bit-Packed.
+        if self.backend != "GPU Bit-Packed":
+            return self.fit_pattern(load_file(0, 0, file_path)), None
+
+        with open(file_path, "r") as file:
+            _, words, width = read_rle(file)
+
+        live_rows = np.flatnonzero(words.any(axis=1))
+        if not len(live_rows):
+            return np.zeros((0, 2), dtype=np.int64), None
+        live_cols = np.flatnonzero(unpack(np.bitwise_or.reduce(words, axis=0)[None], width)[0])
+
+        min_row, max_row, min_col, max_col = int(live_rows[0]), int(live_rows[-1]), int(live_cols[0]), int(live_cols[-1])
+        offset_row, offset_col = self.fit_offset(min_row, min_col, max_row - min_row + 1, max_col - min_col + 1)
+        return np.zeros((0, 2), dtype=np.int64), place_words(words, self.rows, self.cols, offset_row, offset_col, 32)
+
+    def upload_rows(self, grid_rows, live_rows):
+        # New buffers start zeroed, so only the rows the pattern covers have to be uploaded.
+        if not len(live_rows):
+            return
+
+        min_row, max_row = live_rows.min(), live_rows.max()
+        row_bytes = grid_rows.shape[1] * grid_rows.itemsize
+        self.ssbo_in.set_data_region(grid_rows[min_row:max_row + 1].tobytes(), int(min_row) * row_bytes, int(max_row - min_row + 1) * row_bytes)
+
+    def create_gpu_buffers(self):
+        # The final pass of every tick writes the population and live bounding box into stats_buffer,
+        # they are copied back through a fenced staging buffer and picked up in on_update once the GPU is done.
+        self.stats_buffer = create_stats_buffer()
+        self.stats_readback = AsyncReadback(struct.calcsize(STATS_FORMAT))
+
+        # Queued edits are uploaded here for the edit pass, it grows when a batch doesn't fit.
+        self.edit_buffer = create_edit_buffer(64 * 1024)
+
+        self.gpu_timer = GpuTimer()
+
+        self.rule_buffer = create_rule_buffer(self.rule)
+
+    def fit_pattern(self, positions, grow=True):
+        # Center the pattern on the board as an (n, 2) array, growing the board to fit it if the setting allows that.
+        positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+        if not len(positions):
+            return positions
+
+        (min_row, min_col), (max_row, max_col) = positions.min(axis=0), positions.max(axis=0)
+        positions = positions + self.fit_offset(int(min_row), int(min_col), int(max_row - min_row + 1), int(max_col - min_col + 1), grow)
+
+        if self.backend in UNBOUNDED_BACKENDS:
+            return positions
+
+        # Bigger than the board even after growing, keep the window centred on it like restore_macrocell does.
+        inside = (positions >= 0).all(axis=1) & (positions[:, 0] < self.rows) & (positions[:, 1] < self.cols)
+        return positions[inside]
+
+    def fit_offset(self, min_row, min_col, height, width, grow=True):
+        # What fit_pattern adds to the positions of a pattern with the given live bounding box.
+        grow = grow and self.settings_dict.get("fit_grid_to_pattern", True) and self.backend not in UNBOUNDED_BACKENDS
+        if grow and (height > self.rows or width > self.cols):
+            # Leave as much room around the pattern as the pattern itself takes up, up to the largest grid the
+            # settings offer and the GPU can hold as a texture.
+            max_size = self.window.ctx.info.MAX_TEXTURE_SIZE
+            self.rows = max(self.rows, min(height * 2, MAX_ROWS, max_size))
+            self.cols = max(self.cols, min(width * 2, MAX_COLS, max_size))
+
+        return (self.rows - height) // 2 - min_row, (self.cols - width) // 2 - min_col
+
+    def reschedule(self):
+        arcade.unschedule(self.update_generation)
+        if not self.turbo:
+            arcade.schedule(self.update_generation, 1 / self.gps)
+
+    def run_turbo(self, delta_time):
+        start = time.perf_counter()
+        self.update_generation(delta_time, self.turbo_generations)
+
+        if not self.running:
+            return
+
+        self.turbo_generations = self.tune_batch(self.turbo_generations, start)
+
+    def tune_batch(self, generations, start):
+        if self.engine is None:
+            glFinish() # dispatches are asynchronous, wait so the batch is actually timed
+
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        # At most double per frame so a single fast frame doesn't cause a long stall on the next one.
+        # Capped as well, skipping ahead on a cycle is nearly free and would keep doubling otherwise.
+        return max(1, min(generations * 2, int(generations * self.turbo_budget / elapsed), 1 << 24))
+
+    def run_jump(self):
+        start = time.perf_counter()
+        generations = min(self.jump_pending, self.jump_batch)
+        self.jump_pending -= generations
+
+        steps = self.cycle_detector.remaining(self.generation, generations)
+        self.generation += generations # before dispatching, the stats pass records it
+        if self.engine is not None:
+            self.engine.step(steps)
+            self.observe_cycle(self.generation, self.engine.state_key())
+            self.upload_engine_image()
+        elif steps:
+            self.dispatch(steps)
+
+        self.generation_label.text = f"Generation: {self.generation}"
+        self.jump_label.text = f"Jump (H): {self.jump_pending} left" if self.jump_pending else f"Jump (H): 2^{self.jump_exponent}"
+        self.record_history()
+        self.jump_batch = self.tune_batch(self.jump_batch, start)
+
+    def update_generation(self, delta_time, generations=1):
         if self.running:
-            self.generation_delta_time = delta_time
-            self.generation += 1
+            self.generation_delta_time = delta_time / generations
+            steps = generations
+            if self.cycle_action == "Skip Ahead": # on a cycle only the remainder of the period is computed
+                steps = self.cycle_detector.remaining(self.generation, generations)
+            self.generation += generations
+            generations = steps
 
         self.pypresence_generation_count += 1
 
@@ -165,58 +465,340 @@ class Game(arcade.gui.UIView):
             self.pypresence_generation_count = 0
             self.pypresence_client.update(state='In Game', details=f'Generation: {self.generation} Population: {self.population}', start=self.pypresence_client.start_time)
 
-        with self.shader_program:
-            self.shader_program['mouse_row'] = self.mouse_row
-            self.shader_program['mouse_col'] = self.mouse_col
-            self.shader_program['mouse_interaction'] = self.mouse_interaction
-            self.shader_program['rows'] = ROWS
-            self.shader_program['cols'] = COLS
-            self.shader_program['running'] = self.running
-            self.shader_program.dispatch(self.game_of_life_image.width, self.game_of_life_image.height, 1, barrier=pyglet.gl.GL_ALL_BARRIER_BITS)
+        if self.running and not generations: # the board is already in the state of the new generation
+            return
+
+        if self.engine is not None:
+            if self.running:
+                with self.perf.measure("engine step (CPU)"):
+                    self.engine.step(generations)
+                self.observe_cycle(self.generation, self.engine.state_key())
+                self.record_history()
+
+            with self.perf.measure("texture upload (CPU)"):
+                self.upload_engine_image()
+            return
+
+        if not self.running:
+            generations = 1 # one pass keeps the stats up to date with edits
+
+        self.dispatch(generations, self.running)
+        if self.running:
+            self.record_history()
+
+    def dispatch(self, generations, running=True):
+        with self.perf.measure("uniforms, dispatch and rebinding (CPU)"), self.shader_program:
+            self.shader_program['rows'] = self.rows
+            self.shader_program['cols'] = self.cols
+            self.shader_program['running'] = running
+
+            if self.backend == "GPU":
+                self.shader_program['states'] = self.rule.states
+
+            if self.backend == "GPU Bit-Packed":
+                self.shader_program['words'] = word_count(self.cols, 32)
+            groups = dispatch_groups(self.rows, self.cols, self.workgroup_size, self.backend == "GPU Bit-Packed")
+
+            stats = stats_reset(self.generation) # only the final pass writes stats
+            self.stats_buffer.set_data_region(stats, 0, len(stats))
+
+            self.gpu_timer.begin()
+            if self.tiles is not None:
+                self.ssbo_in, self.ssbo_out = self.tiles.dispatch_generations(self.shader_program, self.ssbo_in, self.ssbo_out, generations, running)
+            else:
+                self.ssbo_in, self.ssbo_out = dispatch_generations(self.shader_program, self.ssbo_in, self.ssbo_out, groups, generations)
+            self.gpu_timer.end()
+
+        self.density.stale = True
+
+        self.stats_readback.request(self.stats_buffer)
+
+    def observe_cycle(self, generation, key):
+        if not self.cycle_detector.observe(generation, key):
+            return
+
+        self.cycle_label.text = f"Cycle: period {self.cycle_detector.period} from {self.cycle_detector.start}"
+        if self.cycle_action == "Pause":
+            self.running = False
+
+    def reset_cycle(self):
+        # The board changed outside of the simulation, earlier states say nothing about the new ones.
+        self.cycle_detector.reset(self.generation)
+        self.cycle_label.text = "Cycle: none"
+
+    def apply_edits(self):
+        if not self.edit_queue:
+            return
+
+        rows, cols, values = self.edit_queue.flush(self.rows, self.cols)
+        if not len(rows):
+            return
+
+        self.reset_cycle()
+
+        if self.engine is not None:
+            self.engine.set_cells(rows, cols, values)
+            self.upload_engine_image()
+            return
+
+        if self.backend == "GPU Bit-Packed":
+            words, set_masks, clear_masks = edit_masks(rows, cols, values, self.cols, 32)
+            edits = np.zeros((len(words), 4), dtype=np.uint32)
+            edits[:, 0], edits[:, 1], edits[:, 2] = words, set_masks, clear_masks
+            edit_program = get_shader_program(get_packed_edit_shader_source, self.rows, self.cols)
+        else:
+            edits = np.stack([rows * self.cols + cols, values], axis=1).astype(np.int32)
+            edit_program = get_shader_program(get_edit_shader_source, self.rows, self.cols)
+
+        if edits.nbytes > self.edit_buffer.size:
+            self.edit_buffer.delete()
+            self.edit_buffer = create_edit_buffer(edits.nbytes * 2)
+
+        self.edit_buffer.set_data_region(edits.tobytes(), 0, edits.nbytes)
+
+        with edit_program:
+            edit_program['edit_count'] = len(edits)
+            edit_program['cols'] = self.cols
+            if self.backend == "GPU Bit-Packed":
+                edit_program['words'] = word_count(self.cols, 32)
+            else:
+                edit_program['tile_cols'] = self.tiles.tile_cols if self.tiles is not None else 0
+                edit_program['tile_size'] = self.workgroup_size
+            edit_program.dispatch((len(edits) + 63) // 64, 1, 1, barrier=pyglet.gl.GL_ALL_BARRIER_BITS)
+
+        self.density.stale = True
+
+    def read_cells(self):
+        # Live cells only, the dying states of Generations rules aren't saved.
+        if self.engine is not None:
+            return np.array(self.engine.to_cells() == 1, dtype=np.uint8)
+
+        data = np.frombuffer(self.ssbo_in.get_data(), dtype=np.uint32)
+        if self.backend == "GPU Bit-Packed":
+            return unpack(data.reshape(self.rows, word_count(self.cols, 32)), self.cols)
+
+        return (data.reshape(self.rows, self.cols) == 1).astype(np.uint8)
+
+    def write_cells(self, cells):
+        if self.engine is not None:
+            self.engine.load(cells)
+            self.upload_engine_image()
+        elif self.backend == "GPU Bit-Packed":
+            self.ssbo_in.set_data(pack(cells, 32).tobytes())
+        else:
+            self.ssbo_in.set_data(cells.astype(np.int32).tobytes())
+            if self.tiles is not None:
+                self.tiles.reset()
+
+    def jump(self):
+        # Fast-forward 2^k generations with HashLife, the HashLife backend keeps its off-board cells.
+        generations = 1 << self.jump_exponent
+        if self.rule.states > 2 or self.rule.births_from_nothing:
+            # HashLife can't run these rules, the board is stepped over the next frames instead (see run_jump).
+            # Pressing H again cancels a jump that's still going.
+            self.jump_pending = 0 if self.jump_pending else generations
+            self.jump_batch = 1
+            self.jump_label.text = f"Jump (H): 2^{self.jump_exponent}"
+            return
+
+        remaining = self.cycle_detector.remaining(self.generation, generations)
+        self.generation += generations # before dispatching, the stats pass records it
+
+        if remaining < generations:
+            # A periodic board only has to be stepped by what's left of the jump after whole periods.
+            if self.engine is not None:
+                self.engine.step(remaining)
+                self.upload_engine_image()
+            elif remaining:
+                self.dispatch(remaining)
+        elif isinstance(self.engine, HashLifeEngine):
+            self.engine.advance(self.jump_exponent)
+            self.upload_engine_image()
+        elif isinstance(self.engine, SparseEngine):
+            universe = HashLife(self.engine.universe.cells(), rule=self.rule)
+            universe.advance(self.jump_exponent)
+            self.engine.load_positions(universe.cells())
+            self.upload_engine_image()
+        else:
+            universe = HashLife(map(tuple, np.argwhere(self.read_cells()).tolist()), rule=self.rule)
+            universe.advance(self.jump_exponent)
+            self.write_cells(universe.window(0, 0, self.rows, self.cols))
+            self.reset_cycle() # the unbounded plane doesn't kill cells at the board's edges
+
+        self.generation_label.text = f"Generation: {self.generation}"
+        self.record_history()
+
+    def record_history(self):
+        self.history_end = self.generation # stepping forward through the history stops here
+
+        # The unbounded backends only have a window of their plane on the board, there's nothing to rewind to.
+        if not self.history.memory_cap or self.backend in UNBOUNDED_BACKENDS:
+            return
+
+        # running again from a rewound generation is always recorded, it drops the ones after it
+        newest = self.history.newest_generation()
+        if newest is not None and newest < self.generation < newest + self.history_interval:
+            return
+
+        if self.engine is None: # read back without stalling, recorded in on_update once it arrives
+            if self.history_readback.pending():
+                return
+            if self.backend == "GPU":
+                history_program = get_shader_program(get_history_pack_shader_source, self.rows, self.cols, self.history_planes)
+                with history_program:
+                    history_program.dispatch((word_count(self.cols, 32) + 63) // 64, self.rows, 1, barrier=pyglet.gl.GL_ALL_BARRIER_BITS)
+            self.history_readback.request(self.ssbo_in if self.history_buffer is None else self.history_buffer, tag=self.generation)
+        elif isinstance(self.engine, BitPackedEngine):
+            self.history.record(self.generation, self.engine.cells)
+        else:
+            self.history.record(self.generation, pack_planes(self.engine.to_cells(), self.history_planes))
+
+    def rewind(self, direction, keyframes=False):
+        # Steps one generation back or forth, or to the previous or next keyframe, and pauses there. The board is
+        # restored from the recorded generation at or before it and stepped forward the rest of the way.
+        if keyframes:
+            target = self.history.step(self.generation, direction, keyframes)
+        else:
+            target = self.generation + direction
+
+        base = None if target is None else self.history.step(target + 1, -1)
+        if base is None or target > self.history_end:
+            return
 
-        self.ssbo_in, self.ssbo_out = self.ssbo_out, self.ssbo_in
-        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 3, self.ssbo_in.id)
-        glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 4, self.ssbo_out.id)
+        self.jump_pending = 0 # a jump still being stepped would run on from the rewound board
+        self.jump_label.text = f"Jump (H): 2^{self.jump_exponent}"
+        board = self.history.restore(base)
+        if self.backend == "GPU Bit-Packed":
+            self.ssbo_in.set_data(board.tobytes())
+        elif isinstance(self.engine, BitPackedEngine):
+            self.engine.load_packed(board)
+        else:
+            self.write_cells(unpack_planes(board, self.cols))
+
+        self.running = False
+        self.generation = target
+        if self.engine is not None:
+            if target > base:
+                self.engine.step(target - base)
+            self.upload_engine_image()
+        elif target > base:
+            self.dispatch(target - base)
+
+        self.generation_label.text = f"Generation: {self.generation}"
+        self.reset_cycle()
+
+    def pan(self, rows, cols):
+        self.engine.view_row += rows
+        self.engine.view_col += cols
+        self.upload_engine_image()
+
+    def upload_engine_image(self):
+        image_data = pyglet.image.ImageData(self.cols, self.rows, "RGBA", self.engine.to_rgba())
+        self.game_of_life_image.blit_into(image_data, 0, 0, 0)
+        self.density.stale = True
 
     def on_key_press(self, symbol: int, modifiers: int) -> bool | None:
         super().on_key_press(symbol, modifiers)
 
         if symbol == arcade.key.SPACE:
             self.running = not self.running
+        elif symbol == arcade.key.H:
+            self.jump()
+        elif symbol == arcade.key.F3:
+            self.perf_visible = not self.perf_visible
+            self.perf_label.visible = self.perf_visible
+            self.perf_label.text = self.perf.summary()
+        elif symbol == arcade.key.F4:
+            os.makedirs(log_dir, exist_ok=True)
+            self.perf.dump_csv(os.path.join(log_dir, f"perf_{time.strftime('%Y-%m-%d_%H-%M-%S')}.csv"))
+        elif symbol == arcade.key.T:
+            self.turbo = not self.turbo
+            self.turbo_generations = 1
+            self.fps_label.text = "Generations/second: Turbo" if self.turbo else f"Generations/second: {self.gps}"
+            self.reschedule()
+        elif symbol in (arcade.key.W, arcade.key.A, arcade.key.S, arcade.key.D) and self.backend in UNBOUNDED_BACKENDS:
+            # Row 0 is the bottom of the texture, so moving the view up means higher rows.
+            step_rows, step_cols = max(1, self.rows // 8), max(1, self.cols // 8)
+            if symbol == arcade.key.W:
+                self.pan(step_rows, 0)
+            elif symbol == arcade.key.S:
+                self.pan(-step_rows, 0)
+            elif symbol == arcade.key.A:
+                self.pan(0, -step_cols)
+            else:
+                self.pan(0, step_cols)
+        elif symbol == arcade.key.LEFT or symbol == arcade.key.RIGHT:
+            self.rewind(1 if symbol == arcade.key.RIGHT else -1, bool(modifiers & arcade.key.MOD_SHIFT))
+        elif symbol == arcade.key.Z:
+            self.camera.fit()
+        elif symbol == arcade.key.BRACKETLEFT or symbol == arcade.key.BRACKETRIGHT:
+            self.jump_exponent = max(0, min(64, self.jump_exponent + (1 if symbol == arcade.key.BRACKETRIGHT else -1)))
+            self.jump_label.text = f"Jump (H): 2^{self.jump_exponent}"
         elif symbol == arcade.key.C:
             self.population = 0
             self.generation = 0
 
             self.population_label.text = f"Population: {self.population}"
             self.generation_label.text = f"Generation: {self.generation}"
+            self.cycle_label.text = "Cycle: none"
             
-            self.grid = array('i', [0] * ROWS * COLS)
-
             arcade.unschedule(self.update_generation)
             self.setup_game()
-            arcade.schedule(self.update_generation, 1 / self.gps)
+            self.reschedule()
         elif symbol == arcade.key.R:
             self.population = 0
             self.generation = 0
 
             self.population_label.text = f"Population: {self.population}"
             self.generation_label.text = f"Generation: {self.generation}"
+            self.cycle_label.text = "Cycle: none"
             
-            self.grid = array('i', [0] * ROWS * COLS)
-
             arcade.unschedule(self.update_generation)
             self.setup_game(randomized=True)
-            arcade.schedule(self.update_generation, 1 / self.gps)            
+            self.reschedule()
 
     def on_update(self, delta_time):
         super().on_update(delta_time)
+
+        self.perf.next_frame()
+        self.perf.record("frame", delta_time * 1000)
+
+        if self.turbo:
+            self.run_turbo(delta_time)
+
+        if self.jump_pending and self.save_state is None:
+            self.run_jump()
+
+        if self.engine is None:
+            for milliseconds in self.gpu_timer.poll():
+                self.perf.record("compute dispatch (GPU)", milliseconds)
+
+            stats_data = self.stats_readback.poll()
+            if stats_data is not None:
+                self.population, min_row, min_col, max_row, max_col, hash_low, hash_high, generation = struct.unpack(STATS_FORMAT, stats_data)
+                self.bounding_box = (min_row, min_col, max_row, max_col) if max_row >= 0 else None
+                self.observe_cycle(generation, hash_high << 32 | hash_low)
+
+            if self.history_readback is not None:
+                history_data = self.history_readback.poll()
+                if history_data is not None:
+                    self.history.record(self.history_readback.tag, np.frombuffer(history_data, dtype=np.uint32).reshape(-1, self.rows, word_count(self.cols, 32)))
+
+            if self.save_state is not None:
+                self.poll_save_readback()
         
         if time.perf_counter() - self.last_info_update >= 0.5:
             self.last_info_update = time.perf_counter()
-            self.actual_fps_label.text = f"Actual generations/second: {round(1 / self.generation_delta_time, 2)}"
-            if not self.population < 0: # generation might be faster than 60 FPS, leading to minus population counts.
+            if self.engine is not None:
+                self.population = self.engine.population()
+
+            with self.perf.measure("label update (CPU)"):
+                self.actual_fps_label.text = f"Actual generations/second: {round(1 / self.generation_delta_time, 2)}"
                 self.population_label.text = f"Population: {self.population}"
-            self.generation_label.text = f"Generation: {self.generation}"
+                self.generation_label.text = f"Generation: {self.generation}"
+
+                if self.perf_visible:
+                    self.perf_label.text = self.perf.summary()
 
         if self.window.keyboard[arcade.key.UP] or self.window.keyboard[arcade.key.DOWN]: # type: ignore
             self.gps += 1 if self.window.keyboard[arcade.key.UP] else -1 # type: ignore
@@ -225,14 +807,18 @@ class Game(arcade.gui.UIView):
                 self.gps = 1
 
             self.generation_time = 1 / self.gps
-            self.fps_label.text = f"Generations/second: {self.gps}"
 
-            arcade.unschedule(self.update_generation)
-            arcade.schedule(self.update_generation, self.generation_time)
+            if not self.turbo:
+                self.fps_label.text = f"Generations/second: {self.gps}"
+                self.reschedule()
 
+        self.queue_edits()
+        if self.save_state is None: # queued until the save's readback is done, see poll_save_readback
+            self.apply_edits()
+
+    def queue_edits(self):
         if self.window.mouse[arcade.MOUSE_BUTTON_LEFT] or (self.has_controller and self.controller.a):
             self.mouse_interaction = 1
-            self.population += 1
 
             if time.perf_counter() - self.last_create_sound >= 0.05:
                 self.last_create_sound = time.perf_counter()
@@ -240,42 +826,190 @@ class Game(arcade.gui.UIView):
                     create_sound.play(volume=self.settings_dict.get("sfx_volume", 50) / 100)
         elif self.window.mouse[arcade.MOUSE_BUTTON_RIGHT] or (self.has_controller and self.controller.b):
             self.mouse_interaction = 0
-            self.population -= 1
             if self.settings_dict.get("sfx", True):
                 destroy_sound.play(volume=self.settings_dict.get("sfx_volume", 50) / 100)
         else:
+            if self.rectangle_start is not None: # shift-drag finished, fill the rectangle
+                self.edit_queue.rectangle(self.rectangle_start, self.rectangle_end, self.rectangle_value)
+                self.rectangle_start = None
+
+            self.last_edit_cell = None
             return
-            
-        start_x, start_y = self.image_sprite.x, self.image_sprite.y
+
         mouse_x, mouse_y = (self.window.mouse.data.get('x', 0), self.window.mouse.data.get('y', 0)) if not self.has_controller else (self.cursor_sprite.left, self.cursor_sprite.top)
-        grid_row = int((mouse_y - start_y) / (self.image_sprite.height / ROWS))
-        grid_col = int((mouse_x - start_x) / (self.image_sprite.width / COLS))
+        if not self.camera.inside(mouse_x, mouse_y):
+            self.last_edit_cell = None
+            return
+
+        grid_row, grid_col = map(math.floor, self.camera.screen_to_cell(mouse_x, mouse_y))
 
-        if grid_col < 0 or grid_row < 0 or grid_row >= ROWS or grid_col >= COLS:
+        if grid_col < 0 or grid_row < 0 or grid_row >= self.rows or grid_col >= self.cols:
+            self.last_edit_cell = None
+            return
+
+        cell = (grid_row, grid_col)
+
+        if self.rectangle_start is not None or self.window.keyboard[arcade.key.LSHIFT] or self.window.keyboard[arcade.key.RSHIFT]: # type: ignore
+            if self.rectangle_start is None:
+                self.rectangle_start = cell
+                self.rectangle_value = self.mouse_interaction
+            self.rectangle_end = cell
             return
-        
-        self.mouse_row = grid_row
-        self.mouse_col = grid_col
+
+        # Connect to the cell of the previous frame so fast strokes don't skip cells.
+        self.edit_queue.stroke(self.last_edit_cell or cell, cell, self.mouse_interaction, self.brush_size, self.brush_shape)
+        self.last_edit_cell = cell
 
     def on_mouse_release(self, x, y, button, modifiers):
         if button == arcade.MOUSE_BUTTON_LEFT or button == arcade.MOUSE_BUTTON_RIGHT:
             self.mouse_interaction = -1
 
+    def on_mouse_scroll(self, x, y, scroll_x, scroll_y):
+        super().on_mouse_scroll(x, y, scroll_x, scroll_y)
+
+        if self.camera.inside(x, y):
+            self.camera.zoom_at(1.25 ** scroll_y, x, y)
+
+    def on_mouse_drag(self, x, y, dx, dy, buttons, modifiers):
+        super().on_mouse_drag(x, y, dx, dy, buttons, modifiers)
+
+        if buttons & arcade.MOUSE_BUTTON_MIDDLE:
+            self.camera.pan(dx, dy)
+
     def load(self):
+        arcade.unschedule(self.update_generation)
+        self.delete_board() # the file manager starts a new Game, this one isn't shown again
+        from game.file_manager import FileManager
+        self.window.show_view(FileManager(os.path.expanduser("~"), [".txt", ".rle", *LIFE_EXTENSIONS, MACROCELL_EXTENSION, SNAPSHOT_EXTENSION], False, self.pypresence_client, self.generation, self.running, self.cell_grid, self.gps))
+
+    def stamp(self):
         arcade.unschedule(self.update_generation)
         from game.file_manager import FileManager
-        self.window.show_view(FileManager(os.path.expanduser("~"), [".txt", ".rle"], False, self.pypresence_client, self.generation, self.running, self.cell_grid, self.gps))
+        self.window.show_view(FileManager(os.path.expanduser("~"), [".txt", ".rle", *LIFE_EXTENSIONS, MACROCELL_EXTENSION, SNAPSHOT_EXTENSION], False, self.pypresence_client, self.generation, self.running, self.cell_grid, self.gps, stamp_into=self))
+
+    def stamp_pattern(self, file_path):
+        # Add a pattern to the running board, only its cells are uploaded through the edit pass.
+        positions = self.fit_pattern(load_file(0, 0, file_path), grow=False)
+
+        if self.backend in UNBOUNDED_BACKENDS:
+            positions += (self.engine.view_row, self.engine.view_col)
+            self.engine.load_positions(self.engine.universe.cells() + [tuple(position) for position in positions.tolist()])
+            self.upload_engine_image()
+            self.reset_cycle()
+        else:
+            self.edit_queue.add(positions[:, 0], positions[:, 1], 1)
 
     def save(self):
         arcade.unschedule(self.update_generation)
+        self.turbo = False
+
+        if self.engine is None:
+            self.save_state = "stats" # the GPU board is read back over the next frames, see poll_save_readback
+        elif self.backend in UNBOUNDED_BACKENDS:
+            self.open_save_manager(cells_from_positions(self.engine.universe.cells()))
+        else:
+            cells = self.read_cells()
+            live = np.argwhere(cells)
+            if not len(live):
+                self.open_save_manager(cells[:0, :0], (0, 0))
+                return
+
+            (min_row, min_col), (max_row, max_col) = live.min(axis=0), live.max(axis=0)
+            self.open_save_manager(cells[min_row:max_row + 1, min_col:max_col + 1], (min_row, min_col))
+
+    def poll_save_readback(self):
+        # stats: wait for in-flight stats, then fetch the stats of the final generation again
+        # bounds: once those arrived, copy only the live bounding box, one row at a time
+        # grid: once it arrived, hand the board to the file manager
+        # Edits and jumps are held back until then, so the saved board is the one save was pressed on.
+        if self.save_state == "stats":
+            if not self.stats_readback.pending():
+                self.stats_readback.request(self.stats_buffer)
+                self.save_state = "bounds"
+        elif self.save_state == "bounds":
+            if self.stats_readback.pending():
+                return
+
+            if self.bounding_box is None:
+                self.open_save_manager(np.zeros((0, 0), dtype=np.uint8), (0, 0))
+                return
+
+            # Both layouts are read in 4 byte words, a packed word holds 32 columns.
+            min_row, min_col, max_row, max_col = self.bounding_box
+            packed = self.backend == "GPU Bit-Packed"
+            first_word, last_word = (min_col // 32, max_col // 32) if packed else (min_col, max_col)
+            row_bytes = (word_count(self.cols, 32) if packed else self.cols) * 4
+            band_rows, band_bytes = max_row - min_row + 1, (last_word - first_word + 1) * 4
+
+            self.grid_readback = AsyncReadback(band_bytes * band_rows, slots=1)
+            self.grid_readback.request(self.ssbo_in, min_row * row_bytes + first_word * 4, band_bytes, rows=band_rows, stride=row_bytes)
+            self.save_state = "grid"
+        elif self.save_state == "grid":
+            data = self.grid_readback.poll()
+            if data is None:
+                return
+
+            self.grid_readback.delete()
+            self.grid_readback = None
+
+            min_row, min_col, max_row, max_col = self.bounding_box
+            if self.backend == "GPU Bit-Packed":
+                words = np.frombuffer(data, dtype=np.uint32).reshape(max_row - min_row + 1, -1)
+                start = min_col % 32 # the band starts at the word holding min_col
+                band = unpack(words, start + max_col - min_col + 1)[:, start:]
+            else:
+                band = np.frombuffer(data, dtype=np.int32).reshape(max_row - min_row + 1, -1)
+
+            self.open_save_manager((band == 1).astype(np.uint8), (min_row, min_col))
+
+    def open_save_manager(self, cells, origin=None):
+        # origin is where the cells start on a bounded board, snapshots keep the whole board around them.
+        # The board was read back by now and the file manager starts a new Game, so this one's GL objects go.
+        self.delete_board()
+        self.cell_grid = cells
+
+        snapshot = {"generation": self.generation, "gps": self.gps, "rule": str(self.rule), "compress": self.settings_dict.get("compress_snapshots", False)}
+        if origin is not None:
+            snapshot.update(rows=self.rows, cols=self.cols, top=int(origin[0]), left=int(origin[1]))
+
         from game.file_manager import FileManager
-        self.window.show_view(FileManager(os.path.expanduser("~"), [".txt", ".rle"], True, self.pypresence_client, self.generation, self.running, self.cell_grid, self.gps))
+        self.window.show_view(FileManager(os.path.expanduser("~"), [".txt", ".rle", *LIFE_EXTENSIONS, MACROCELL_EXTENSION, SNAPSHOT_EXTENSION], True, self.pypresence_client, self.generation, self.running, self.cell_grid, self.gps, snapshot=snapshot, universe=self.engine.universe if self.backend == "HashLife" else None))
 
     def on_draw(self):
         super().on_draw()
 
-        self.grid_outline.draw()
-        self.image_sprite.draw()
+        with self.perf.measure("sprite draw (CPU)"):
+            self.grid_outline.draw()
+            self.draw_board()
 
         if self.has_controller:
-            self.spritelist.draw()
\ No newline at end of file
+            self.spritelist.draw()
+
+    def draw_board(self):
+        # Only the cells in view are drawn, zoomed out below a pixel per cell the density image of the level
+        # closest to one texel per pixel is drawn instead.
+        visible = self.camera.visible()
+        level = self.camera.level(self.density.levels)
+        texture = self.game_of_life_image
+
+        if level:
+            if self.density.needs_build(level, visible):
+                if self.engine is not None:
+                    self.density.build_from_cells(self.engine.to_cells(), level, visible)
+                else:
+                    self.density.build(self.game_of_life_image, level, visible)
+            texture = self.density.texture(level)
+
+        scale = 1 << level
+        row0, col0, row1, col1 = visible
+        row0, col0 = row0 // scale, col0 // scale
+        row1, col1 = min(texture.height, -(-row1 // scale)), min(texture.width, -(-col1 // scale))
+
+        self.image_sprite.image = texture.get_region(col0, row0, col1 - col0, row1 - row0)
+        self.image_sprite.scale_x = self.image_sprite.scale_y = self.camera.zoom * scale
+        self.image_sprite.x, self.image_sprite.y = self.camera.cell_to_screen(row0 * scale, col0 * scale)
+
+        # partly visible cells at the edges would stick out of the outline
+        self.window.ctx.scissor = (int(self.camera.x), int(self.camera.y), math.ceil(self.camera.width), math.ceil(self.camera.height))
+        self.image_sprite.draw()
+        self.window.ctx.scissor = None
\ No newline at end of file
@@ -0,0 +1,112 @@
+import zlib
+
+import numpy as np
+
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+from game.bitpacked import pack, unpack
+
+KEYFRAME_INTERVAL = 64
+
+# Boards are recorded as one bit plane per bit of the cell states, packed 32 cells to a word like the GPU
+# Bit-Packed layout, so a Life board is a bit per cell and the XOR deltas are 1-bit change masks.
+def state_planes(states):
+    return max(1, (states - 1).bit_length())
+
+def pack_planes(cells, planes):
+    return np.stack([pack((cells >> plane) & 1, 32) for plane in range(planes)])
+
+def unpack_planes(words, cols):
+    cells = np.zeros((words.shape[1], cols), dtype=np.uint8)
+    for plane in range(len(words)):
+        cells |= unpack(words[plane], cols) << plane
+    return cells
+
+class RewindHistory:
+    # Board states by generation under a memory cap. Every KEYFRAME_INTERVAL-th state is kept whole, the ones
+    # in between as the XOR with the state before them, both zlib-compressed. Consecutive states differ in few
+    # cells, so the deltas are almost all zeros and compress to a tiny fraction of the board. A state is rebuilt
+    # by replaying the deltas forward from the keyframe before it. Once over the cap the oldest keyframe goes,
+    # together with the deltas that need it.
+    def __init__(self, memory_cap, keyframe_interval=KEYFRAME_INTERVAL):
+        self.memory_cap = memory_cap
+        self.keyframe_interval = keyframe_interval
+        self.clear()
+
+    def clear(self):
+        self.segments = deque() # lists of (generation, compressed), the first one is the keyframe
+        self.size = 0
+        self.newest = None # uncompressed last state, the next delta is taken against it
+        self.shape = None
+        self.dtype = None
+
+    def newest_generation(self):
+        return self.segments[-1][-1][0] if self.segments else None
+
+    def generations(self):
+        return [generation for segment in self.segments for generation, _ in segment]
+
+    def record(self, generation, board):
+        board = np.ascontiguousarray(board)
+        if self.newest is not None and (board.shape != self.shape or board.dtype != self.dtype):
+            self.clear()
+
+        if self.segments and generation <= self.segments[-1][-1][0]: # running again from a rewound state
+            self.truncate(generation)
+
+        self.shape, self.dtype = board.shape, board.dtype
+        data = board.view(np.uint8).reshape(-1)
+
+        # a fresh keyframe also when a single segment is over the cap, so the one before can be evicted
+        if self.newest is None or len(self.segments[-1]) >= self.keyframe_interval or self.size > self.memory_cap:
+            compressed = zlib.compress(data.tobytes(), 1)
+            self.segments.append([(generation, compressed)])
+        else:
+            compressed = zlib.compress(np.bitwise_xor(data, self.newest).tobytes(), 1)
+            self.segments[-1].append((generation, compressed))
+
+        self.size += len(compressed)
+        self.newest = data.copy()
+
+        while self.size > self.memory_cap and len(self.segments) > 1:
+            self.size -= sum(len(compressed) for _, compressed in self.segments.popleft())
+
+    def truncate(self, generation):
+        # Forget generation and everything after it.
+        while self.segments and self.segments[-1][0][0] >= generation:
+            self.size -= sum(len(compressed) for _, compressed in self.segments.pop())
+
+        if self.segments:
+            segment = self.segments[-1]
+            while segment[-1][0] >= generation:
+                self.size -= len(segment.pop()[1])
+
+        newest = self.generations()[-1] if self.segments else None
+        self.newest = None if newest is None else self.restore(newest).view(np.uint8).reshape(-1).copy()
+
+    def restore(self, generation):
+        # The board at a retained generation, None if it isn't retained.
+        for segment in self.segments:
+            if segment[0][0] <= generation <= segment[-1][0]:
+                break
+        else:
+            return None
+
+        data = np.frombuffer(zlib.decompress(segment[0][1]), dtype=np.uint8).copy()
+        for delta_generation, compressed in segment[1:]:
+            if delta_generation > generation:
+                break
+            data ^= np.frombuffer(zlib.decompress(compressed), dtype=np.uint8)
+
+        return data.view(self.dtype).reshape(self.shape)
+
+    def step(self, generation, direction, keyframes=False):
+        # Retained generation before (direction -1) or after (1) generation, only keyframes if keyframes is set.
+        generations = [segment[0][0] for segment in self.segments] if keyframes else self.generations()
+        if direction < 0:
+            index = bisect_left(generations, generation) - 1
+        else:
+            index = bisect_right(generations, generation)
+
+        return generations[index] if 0 <= index < len(generations) else None
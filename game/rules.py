@@ -0,0 +1,131 @@
+import re
+
+import numpy as np
+
+# Rule strings compile into one lookup table indexed by state * 256 + neighbourhood, where the neighbourhood
+# has bit i set when the neighbour at NEIGHBOR_OFFSETS[i] is alive (state 1). The value is the next state.
+# Accepted: B3/S23, S/B like 23/3, Generations like B2/S/C3 or 23/3/3 (S/B/C), and isotropic
+# non-totalistic (Hensel) rules like B2-a/S12 or B3/S2-i34q.
+LIFE_RULE = "B3/S23"
+
+# (row, col) offsets going round the cell: N, NE, E, SE, S, SW, W, NW
+NEIGHBOR_OFFSETS = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+
+# One neighbourhood of every isotropic class in Hensel notation, as indices into NEIGHBOR_OFFSETS.
+# Classes with 5 to 8 neighbours are the complements of those with 3 to 0.
+HENSEL_CLASSES = {
+    1: {"c": (1,), "e": (0,)},
+    2: {"c": (1, 3), "e": (0, 2), "k": (0, 3), "a": (0, 1), "i": (0, 4), "n": (1, 5)},
+    3: {"c": (1, 3, 5), "e": (0, 2, 4), "k": (0, 2, 5), "a": (0, 1, 2), "i": (0, 1, 7), "n": (0, 1, 3), "y": (0, 3, 5), "q": (0, 1, 5), "j": (0, 1, 6), "r": (0, 1, 4)},
+    4: {"c": (1, 3, 5, 7), "e": (0, 2, 4, 6), "k": (0, 1, 3, 6), "a": (0, 1, 2, 3), "i": (0, 1, 3, 4), "n": (0, 1, 3, 7), "y": (0, 1, 3, 5), "q": (0, 1, 2, 5), "j": (0, 1, 4, 6), "r": (0, 1, 2, 4), "t": (0, 3, 4, 5), "w": (1, 2, 4, 5), "z": (0, 1, 4, 5)},
+}
+
+RULE_PART = re.compile(r"(\d)(-?)([a-z]*)")
+
+def neighborhood_mask(indices):
+    return sum(1 << index for index in indices)
+
+def symmetries(mask):
+    # Every rotation and reflection of a neighbourhood. Going round the ring, a quarter turn is two steps.
+    ring = [(mask >> index) & 1 for index in range(8)]
+    masks = set()
+    for turn in range(0, 8, 2):
+        rotated = ring[turn:] + ring[:turn]
+        for cells in (rotated, rotated[:1] + rotated[1:][::-1]):
+            masks.add(sum(bit << index for index, bit in enumerate(cells)))
+    return masks
+
+def hensel_masks(count, letter):
+    if count > 4:
+        return {255 ^ mask for mask in hensel_masks(8 - count, letter)}
+
+    classes = HENSEL_CLASSES.get(count, {})
+    if letter not in classes:
+        raise ValueError(f"{count}{letter} is not an isotropic neighbourhood")
+    return symmetries(neighborhood_mask(classes[letter]))
+
+def count_masks(count):
+    return {mask for mask in range(256) if bin(mask).count("1") == count}
+
+def parse_conditions(text):
+    # "2-a3" -> bool array over all 256 neighbourhoods
+    table = np.zeros(256, dtype=bool)
+    position = 0
+    for match in RULE_PART.finditer(text):
+        if match.start() != position:
+            break
+        position = match.end()
+
+        count, negate, letters = int(match.group(1)), match.group(2), match.group(3)
+        if count > 8:
+            raise ValueError(f"{count} neighbours is more than a cell has")
+
+        masks = set().union(*(hensel_masks(count, letter) for letter in letters)) if letters else count_masks(count)
+        if negate:
+            masks = count_masks(count) - masks
+        table[list(masks)] = True
+
+    if position != len(text):
+        raise ValueError(f"can't parse {text!r}")
+
+    return table
+
+class Rule:
+    def __init__(self, text, birth, survival, states=2):
+        self.text = text
+        self.states = states
+
+        # dead cells are born, live ones survive or start dying, dying ones keep counting up to dead again
+        table = np.zeros((states, 256), dtype=np.uint8)
+        table[0] = birth
+        table[1] = np.where(survival, 1, 2 % states)
+        for state in range(2, states):
+            table[state] = (state + 1) % states
+        self.table = table.reshape(-1)
+
+        masks = np.arange(256)
+        first_of_count = (1 << np.array([bin(mask).count("1") for mask in masks])) - 1
+        self.totalistic = bool((table[:2] == table[:2, first_of_count]).all())
+        self.births_from_nothing = bool(table[0, 0])
+
+    def count_terms(self):
+        # (count, born, survives) for every neighbour count that leaves a cell alive, for totalistic rules.
+        # The bit-sliced engines evaluate these instead of the table.
+        terms = []
+        for count in range(9):
+            born, survives = self.table[(1 << count) - 1] == 1, self.table[256 + (1 << count) - 1] == 1
+            if born or survives:
+                terms.append((count, bool(born), bool(survives)))
+        return terms
+
+    def __str__(self):
+        return self.text
+
+def parse_rule(text):
+    # A Golly grid suffix like :P10,10 or :T100,100 is dropped, the board has its own edges.
+    parts = text.strip().replace(" ", "").split(":")[0].split("/")
+    if len(parts) not in (2, 3):
+        raise ValueError(f"{text!r} is not a rule")
+
+    states = 2
+    if any(part[:1] in "BbSs" and part for part in parts):
+        sections = {}
+        for part in parts:
+            if not part or part[0] not in "BbSsCcGg":
+                raise ValueError(f"{text!r} is not a rule")
+            sections["G" if part[0] in "Cc" else part[0].upper()] = part[1:]
+        birth, survival = sections.get("B", ""), sections.get("S", "")
+        if "G" in sections:
+            states = int(sections["G"])
+    else: # S/B and Generations S/B/C
+        survival, birth = parts[0], parts[1]
+        if len(parts) == 3:
+            states = int(parts[2])
+
+    if not 2 <= states <= 256:
+        raise ValueError(f"{states} states are not supported")
+
+    canonical = f"B{birth}/S{survival}" + (f"/C{states}" if states > 2 else "")
+    return Rule(canonical, parse_conditions(birth), parse_conditions(survival), states)
+
+LIFE = parse_rule(LIFE_RULE)
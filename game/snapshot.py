@@ -0,0 +1,68 @@
+import mmap, struct, zlib
+
+import numpy as np
+
+from game.bitpacked import pack_positions, word_count
+from game.rules import LIFE_RULE
+
+# Header, rule text, then the board as rows of little-endian uint32 words in the packed shader layout.
+# Compressed snapshots store every band of band_rows rows as its own zlib stream after a table of their sizes.
+SNAPSHOT_EXTENSION = ".snap"
+SNAPSHOT_MAGIC = b"GOLSNAP1"
+SNAPSHOT_HEADER = struct.Struct("<8sIIqIIII") # magic, rows, cols, generation, gps, flags, band rows, rule length
+COMPRESSED = 1
+BAND_ROWS = 256
+
+def save_snapshot(file_path, words, cols, generation=0, gps=60, rule=LIFE_RULE, compress=False, band_rows=BAND_ROWS):
+    words = np.ascontiguousarray(words, dtype="<u4")
+    rows, rule = len(words), rule.encode("ascii")
+
+    with open(file_path, "wb") as file:
+        file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, rows, cols, generation, int(gps), COMPRESSED if compress else 0, band_rows, len(rule)))
+        file.write(rule)
+
+        if not compress:
+            file.write(words.data)
+            return
+
+        # Bands are compressed one at a time, the size table is filled in once they are all written.
+        band_sizes = np.zeros((rows + band_rows - 1) // band_rows, dtype="<u4")
+        table_offset = file.tell()
+        file.write(band_sizes.tobytes())
+
+        for band, band_start in enumerate(range(0, rows, band_rows)):
+            data = zlib.compress(words[band_start:band_start + band_rows].tobytes(), 1)
+            band_sizes[band] = len(data)
+            file.write(data)
+
+        file.seek(table_offset)
+        file.write(band_sizes.tobytes())
+
+def save_cells_snapshot(file_path, cells, rows=None, cols=None, top=0, left=0, **header):
+    # cells is a crop of a rows x cols board starting at (top, left), only its live cells are packed.
+    rows, cols = rows or max(cells.shape[0], 1), cols or max(cells.shape[1], 1)
+    words = pack_positions(np.argwhere(cells) + (top, left), rows, cols, 32)
+
+    save_snapshot(file_path, words, cols, **header)
+
+def load_snapshot(file_path):
+    # (header, words). Uncompressed snapshots come back as a read-only view of the memory-mapped file.
+    with open(file_path, "rb") as file:
+        magic, rows, cols, generation, gps, flags, band_rows, rule_length = SNAPSHOT_HEADER.unpack(file.read(SNAPSHOT_HEADER.size))
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{file_path} is not a snapshot")
+
+        header = {"rows": rows, "cols": cols, "generation": generation, "gps": gps, "rule": file.read(rule_length).decode("ascii")}
+        row_words = word_count(cols, 32)
+
+        if not flags & COMPRESSED:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            return header, np.frombuffer(mapped, dtype="<u4", count=rows * row_words, offset=file.tell()).reshape(rows, row_words)
+
+        band_sizes = np.fromfile(file, dtype="<u4", count=(rows + band_rows - 1) // band_rows)
+        words = np.empty((rows, row_words), dtype="<u4")
+        for band, band_start in enumerate(range(0, rows, band_rows)):
+            band_words = words[band_start:band_start + band_rows]
+            band_words[:] = np.frombuffer(zlib.decompress(file.read(int(band_sizes[band]))), dtype="<u4").reshape(band_words.shape)
+
+        return header, words
@@ -0,0 +1,197 @@
+import argparse, json, os, re, time
+
+import numpy as np
+
+from collections import Counter
+from functools import partial
+
+from game.hashlife import HashLife
+from game.rules import NEIGHBOR_OFFSETS
+from game.sparse_engine import SparseLife
+
+# apgsearch-style soup search: random soups are run until their population turns periodic, then the
+# leftover objects are separated, classified and counted under their apgcode (xs still lifes,
+# xp oscillators, xq spaceships, zz anything that didn't settle on its own).
+MAX_PERIOD = 60
+STABLE_WINDOW = 600
+WECHSLER = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+def random_soup(seed, shape=(16, 16), density=0.5):
+    return (np.random.default_rng(seed).random(shape) < density).astype(np.uint8)
+
+def population_period(populations):
+    history = np.asarray(populations)
+    for period in range(1, MAX_PERIOD + 1):
+        if (history[period:] == history[:-period]).all():
+            return period
+    return None
+
+def evolve_until_stable(universe, max_generations=20000):
+    # True once the population repeated with some period for STABLE_WINDOW generations.
+    populations = []
+    for generation in range(max_generations):
+        populations.append(universe.population)
+        if generation % 100 == 0 and len(populations) >= STABLE_WINDOW and population_period(populations[-STABLE_WINDOW:]):
+            return True
+
+        universe.step(1)
+
+    return False
+
+def components(cells):
+    # 8-connected groups of cells.
+    remaining = set(cells)
+    groups = []
+
+    while remaining:
+        stack = [remaining.pop()]
+        group = []
+        while stack:
+            row, col = stack.pop()
+            group.append((row, col))
+            for dy, dx in NEIGHBOR_OFFSETS:
+                neighbor = (row + dy, col + dx)
+                if neighbor in remaining:
+                    remaining.remove(neighbor)
+                    stack.append(neighbor)
+
+        groups.append(group)
+
+    return groups
+
+def separate(cells, generations=MAX_PERIOD):
+    # The objects of a settled soup, close to apgsearch: connected groups of cells are run apart and together,
+    # at the first generation where they differ the groups next to the differing cells interact and are merged,
+    # then everything is run again. Objects near each other stay separate unless they really interact,
+    # objects with phases that fall apart into several groups are put back together.
+    groups = components(cells)
+
+    while len(groups) > 1:
+        together = SparseLife(cells)
+        apart = [SparseLife(group) for group in groups]
+        interacting = None
+
+        for _ in range(generations):
+            before = [set(universe.live) for universe in apart]
+            together.step(1)
+            for universe in apart:
+                universe.step(1)
+
+            differing = together.live ^ set().union(*(universe.live for universe in apart))
+            if differing:
+                # only groups with a cell around a differing one can have caused it, always at least two
+                around = {(row + dy, col + dx) for row, col in differing for dy, dx in NEIGHBOR_OFFSETS + [(0, 0)]}
+                interacting = [index for index, live in enumerate(before) if not live.isdisjoint(around)]
+                break
+
+        if interacting is None:
+            break
+
+        merged = [cell for index in interacting for cell in groups[index]]
+        groups = [merged] + [group for index, group in enumerate(groups) if index not in interacting]
+
+    return groups
+
+def normalize(cells):
+    rows, cols = zip(*cells)
+    top, left = min(rows), min(cols)
+    return frozenset((row - top, col - left) for row, col in cells), (top, left)
+
+def wechsler(cells):
+    # Extended Wechsler code of a 2D array: strips of 5 rows, one base-32 digit per column.
+    strips = []
+    for start in range(0, len(cells), 5):
+        strip = cells[start:start + 5].astype(np.int64)
+        values = (strip << np.arange(len(strip))[:, None]).sum(axis=0)
+        strips.append("".join(WECHSLER[value] for value in values.tolist()).rstrip("0"))
+
+    def zeros(match):
+        count = len(match.group())
+        return "w" if count == 2 else "x" if count == 3 else "y" + WECHSLER[count - 4]
+
+    return re.sub("0{2,39}", zeros, "z".join(strips))
+
+def canonical_code(phases):
+    # Shortest, then alphabetically first code over every phase in all 8 orientations.
+    codes = []
+    for phase in phases:
+        rows, cols = zip(*phase)
+        cells = np.zeros((max(rows) + 1, max(cols) + 1), dtype=np.uint8)
+        cells[list(rows), list(cols)] = 1
+
+        for flipped in (cells, cells[:, ::-1]):
+            for turns in range(4):
+                codes.append(wechsler(np.rot90(flipped, turns)))
+
+    return min(codes, key=lambda code: (len(code), code))
+
+def classify(component):
+    # apgcode of one separated object, found by running it alone until it repeats.
+    start, _ = normalize(component)
+    universe = SparseLife(component)
+    phases = [start]
+
+    for period in range(1, MAX_PERIOD + 1):
+        universe.step(1)
+        if not universe.live:
+            break
+
+        phase, offset = normalize(universe.live)
+        if phase == start:
+            moved = offset != normalize(component)[1]
+            prefix = f"xq{period}" if moved else f"xs{len(start)}" if period == 1 else f"xp{period}"
+            return f"{prefix}_{canonical_code(phases)}"
+
+        phases.append(phase)
+
+    return f"zz_{len(start)}"
+
+def soup_census(seed, size=16, density=0.5, max_generations=20000):
+    # (seed, census) of one soup, the same seed always gives the same census.
+    universe = HashLife(np.argwhere(random_soup(seed, (size, size), density)).tolist())
+    if not evolve_until_stable(universe, max_generations):
+        return seed, Counter({"unstable": 1})
+
+    return seed, Counter(classify(component) for component in separate(universe.cells()))
+
+def search(seeds, size=16, density=0.5, max_generations=20000, workers=None):
+    # Census over all soups run on every core, and the first seed each object came from.
+    # Imported here, multiprocessing is left out of the release build and the game imports random_soup from this module.
+    from concurrent.futures import ProcessPoolExecutor
+
+    census, samples = Counter(), {}
+    run = partial(soup_census, size=size, density=density, max_generations=max_generations)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for seed, soup in executor.map(run, seeds, chunksize=16):
+            census.update(soup)
+            for code in soup:
+                samples.setdefault(code, seed)
+
+    return census, samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Search random soups and count the objects they settle into.")
+    parser.add_argument("--soups", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="first seed, soup i uses seed + i")
+    parser.add_argument("--size", type=int, default=16)
+    parser.add_argument("--density", type=float, default=0.5)
+    parser.add_argument("--max-generations", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", help="JSON file for the census")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    census, samples = search(range(args.seed, args.seed + args.soups), args.size, args.density, args.max_generations, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for code, count in census.most_common():
+        print(f"{count:>8} {code} (seed {samples[code]})")
+    print(f"{args.soups} soups in {elapsed:.1f}s ({args.soups / elapsed:.1f} soups/s)")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"soups": args.soups, "seed": args.seed, "size": args.size, "density": args.density, "census": dict(census.most_common()), "samples": samples}, file, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import numpy as np
+
+from array import array
+
+from game.cpu_engine import cells_to_rgba
+from game.rules import LIFE, NEIGHBOR_OFFSETS
+
+class SparseLife:
+    # Live cells on an unbounded plane. Only cells that changed last generation and their neighbours
+    # can change next, so that active region is all a step looks at. Two state rules without B0 only.
+    def __init__(self, positions=(), rule=LIFE):
+        self.rule = rule
+        self.table = rule.table.tolist()
+        self.neighbor_bits = [(dy, dx, 1 << bit) for bit, (dy, dx) in enumerate(NEIGHBOR_OFFSETS)]
+        self.live = set()
+        self.active = set()
+        self.generation = 0
+        self.set_cells(positions)
+
+    def set_cells(self, positions):
+        self.live = set(map(tuple, positions))
+        self.active = set(self.live)
+
+    def set_cell(self, row, col, value):
+        cell = (row, col)
+        if value and cell not in self.live:
+            self.live.add(cell)
+        elif not value and cell in self.live:
+            self.live.discard(cell)
+        else:
+            return
+
+        self.active.add(cell)
+
+    def step(self, generations=1):
+        live, table, neighbor_bits = self.live, self.table, self.neighbor_bits
+
+        for _ in range(generations):
+            candidates = set()
+            for row, col in self.active:
+                candidates.add((row, col))
+                for dy, dx in NEIGHBOR_OFFSETS:
+                    candidates.add((row + dy, col + dx))
+
+            births, deaths = [], []
+            for cell in candidates:
+                row, col = cell
+                neighborhood = 0
+                for dy, dx, bit in neighbor_bits:
+                    if (row + dy, col + dx) in live:
+                        neighborhood |= bit
+
+                if cell in live:
+                    if not table[256 | neighborhood]:
+                        deaths.append(cell)
+                elif table[neighborhood]:
+                    births.append(cell)
+
+            live.difference_update(deaths)
+            live.update(births)
+
+            self.active = set(births)
+            self.active.update(deaths)
+            self.generation += 1
+
+    @property
+    def population(self):
+        return len(self.live)
+
+    def bounding_box(self):
+        if not self.live:
+            return None
+
+        rows = [row for row, _ in self.live]
+        cols = [col for _, col in self.live]
+        return min(rows), min(cols), max(rows), max(cols)
+
+    def cells(self):
+        return list(self.live)
+
+    def window(self, top, left, rows, cols):
+        cells = np.zeros((rows, cols), dtype=np.uint8)
+        if not self.live:
+            return cells
+
+        positions = np.array(list(self.live), dtype=np.int64) - (top, left)
+        inside = (positions[:, 0] >= 0) & (positions[:, 0] < rows) & (positions[:, 1] >= 0) & (positions[:, 1] < cols)
+        cells[positions[inside, 0], positions[inside, 1]] = 1
+
+        return cells
+
+class SparseEngine:
+    # Board-sized window over a SparseLife plane, (view_row, view_col) is the top left cell in view.
+    def __init__(self, rows, cols, grid=None, rule=LIFE):
+        self.rows = rows
+        self.cols = cols
+        self.view_row = 0
+        self.view_col = 0
+        self.universe = SparseLife(rule=rule)
+
+        if grid is not None:
+            self.load(grid)
+
+    def load(self, grid):
+        cells = np.asarray(grid).reshape(self.rows, self.cols)
+        self.load_positions((row + self.view_row, col + self.view_col) for row, col in np.argwhere(cells).tolist())
+
+    def load_positions(self, positions):
+        self.universe.set_cells(positions)
+
+    def set_cell(self, row, col, value):
+        self.universe.set_cell(row + self.view_row, col + self.view_col, value)
+
+    def set_cells(self, rows, cols, values):
+        for row, col, value in zip(rows.tolist(), cols.tolist(), values.tolist()):
+            self.set_cell(row, col, value)
+
+    def step(self, generations=1):
+        self.universe.step(generations)
+
+    def population(self):
+        return self.universe.population
+
+    def state_key(self):
+        return hash(frozenset(self.universe.live))
+
+    def to_cells(self):
+        return self.universe.window(self.view_row, self.view_col, self.rows, self.cols)
+
+    def to_array(self):
+        return array('i', self.to_cells().astype(np.int32).tobytes())
+
+    def to_rgba(self):
+        return cells_to_rgba(self.to_cells())
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+from game.cpu_engine import NumpyEngine, count_next, table_next
+from game.rules import LIFE, NEIGHBOR_OFFSETS
+
+# The board is cut into row bands that step at the same time on a thread pool, numpy releases the GIL
+# inside its array loops so the bands really run in parallel. Every band reads its neighbours' edge rows
+# (the halo) from a padded copy of the alive cells and writes its own rows into a second one, the copies
+# swap every generation so the only synchronisation is waiting for all bands once per generation.
+MIN_BAND_ROWS = 64
+
+pool = None
+
+def thread_pool():
+    # One pool shared by every engine, so starting new games doesn't pile up threads.
+    global pool
+    if pool is None:
+        pool = ThreadPoolExecutor(os.cpu_count() or 1, thread_name_prefix="band")
+    return pool
+
+class Band:
+    def __init__(self, engine, start, end):
+        self.cells = engine.cells[start:end]
+        self.terms = engine.terms
+        self.table = engine.rule.table
+
+        # Views into the engine's full size scratch buffers, so bands never share memory they write to.
+        self.neighbors, self.shifted = engine.neighbors[start:end], engine.shifted[start:end]
+        self.scratch, self.next = engine.scratch[start:end], engine.next[start:end]
+
+        cols = engine.cols
+        self.offsets = [[(padded[start + 1 + dy:end + 1 + dy, 1 + dx:cols + 1 + dx], bit) for bit, (dy, dx) in enumerate(NEIGHBOR_OFFSETS)] for padded in engine.buffers]
+        self.outputs = [padded[start + 1:end + 1, 1:cols + 1] for padded in engine.buffers]
+
+    def step(self, current):
+        offsets = self.offsets[current]
+        if self.terms is not None:
+            count_next(offsets, self.cells.view(np.bool_), self.terms, self.neighbors, self.scratch, self.next)
+            self.cells[:] = self.next
+        else:
+            table_next(offsets, self.cells, self.table, self.neighbors, self.shifted, self.cells)
+
+        # publish this band's rows as the halo for the next generation
+        np.equal(self.cells, 1, out=self.outputs[1 - current])
+
+class ThreadedEngine(NumpyEngine):
+    def __init__(self, rows, cols, grid=None, rule=LIFE, threads=None):
+        super().__init__(rows, cols, grid, rule)
+
+        self.buffers = [self.padded, np.zeros_like(self.padded)]
+
+        threads = threads or os.cpu_count() or 1
+        bands = max(1, min(threads, rows // MIN_BAND_ROWS))
+        edges = np.linspace(0, rows, bands + 1).astype(int)
+        self.bands = [Band(self, start, end) for start, end in zip(edges[:-1], edges[1:])]
+
+    def step(self, generations=1):
+        # cells can be edited between steps, so the halo copy is refreshed from them first
+        np.equal(self.cells, 1, out=self.padded[1:-1, 1:-1])
+
+        current = 0
+        for _ in range(generations):
+            if len(self.bands) == 1:
+                self.bands[0].step(current)
+            else:
+                list(thread_pool().map(Band.step, self.bands, [current] * len(self.bands)))
+            current = 1 - current
@@ -0,0 +1,125 @@
+import argparse, time, sys
+
+import numpy as np
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+from game.backends import CPU_BACKENDS, UNBOUNDED_BACKENDS, backend_for_rule
+from game.cycle_detection import CycleDetector
+from game.file_support import load_file, load_rule, save_file, file_type_from_path, cells_from_positions
+from game.rules import LIFE_RULE, parse_rule
+
+# Runs a pattern on one of the CPU backends without a window, sound or Discord RPC, for batch jobs on servers.
+# python headless.py pattern.rle 100000 --backend HashLife --output result.mc
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 # bytes on macOS, KiB elsewhere
+
+def create_engine(backend, positions, size=None, rule=None, margin=64):
+    # The pattern is centred on the requested board, or on its bounding box with margin cells around it.
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+    extent = positions.max(axis=0) - positions.min(axis=0) + 1 if len(positions) else np.zeros(2, dtype=np.int64)
+    rows, cols = (size[1], size[0]) if size else map(int, extent + 2 * margin)
+
+    if len(positions):
+        positions = positions - positions.min(axis=0) + (np.array((rows, cols)) - extent) // 2
+
+    rule = rule or parse_rule(LIFE_RULE)
+    if backend in UNBOUNDED_BACKENDS:
+        engine = CPU_BACKENDS[backend](rows, cols, rule=rule)
+        engine.load_positions(positions.tolist())
+        return engine
+
+    inside = (positions[:, 0] >= 0) & (positions[:, 0] < rows) & (positions[:, 1] >= 0) & (positions[:, 1] < cols)
+    grid = np.zeros((rows, cols), dtype=np.uint8)
+    grid[positions[inside, 0], positions[inside, 1]] = 1
+
+    return CPU_BACKENDS[backend](rows, cols, grid, rule)
+
+def run(engine, generations, batch=None, detector=None):
+    # Steps in batches so progress can be reported, returns the seconds spent stepping. With a detector every
+    # generation is sampled, and once the board turns periodic only the rest of the last period is computed.
+    batch = batch or generations
+    elapsed, done = 0.0, 0
+    if detector is not None:
+        detector.observe(0, engine.state_key())
+
+    while done < generations:
+        count = min(batch, generations - done)
+
+        start = time.perf_counter()
+        if detector is None:
+            engine.step(count)
+        else:
+            for generation in range(done + 1, done + count + 1):
+                engine.step(1)
+                if detector.observe(generation, engine.state_key()):
+                    engine.step(detector.remaining(generation, generations - generation))
+                    count = generations - done
+                    break
+        elapsed += time.perf_counter() - start
+        done += count
+
+        if done < generations:
+            print(f"{done}/{generations} generations, population {engine.population()}", file=sys.stderr)
+
+    return elapsed
+
+def save_result(engine, backend, rule, file_path):
+    file_type = file_type_from_path(file_path)
+    if backend in UNBOUNDED_BACKENDS:
+        cells = None if file_type == "macrocell" and backend == "HashLife" else cells_from_positions(engine.universe.cells())
+    else:
+        cells = (engine.to_cells() == 1).astype(np.uint8) # live cells only, dying Generations states aren't saved
+
+    universe = engine.universe if backend == "HashLife" else None
+    save_file(cells, file_path, file_type, universe=universe, rule=str(rule))
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Game Of Life pattern without a window.")
+    parser.add_argument("pattern", help="pattern file, any format the game can load")
+    parser.add_argument("generations", type=int)
+    parser.add_argument("--backend", choices=list(CPU_BACKENDS), default="CPU Bit-Packed")
+    parser.add_argument("--rule", help="rule string like B36/S23, B2/S/C3 or B2-a/S12, the pattern file's rule by default")
+    parser.add_argument("--size", help="board size as COLSxROWS for the bounded backends, fits the pattern by default")
+    parser.add_argument("--batch", type=int, help="generations per progress report")
+    parser.add_argument("--skip-cycles", action="store_true", help="hash every generation and skip ahead once the board is periodic")
+    parser.add_argument("--output", help="file to save the final board to, the format follows the extension")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    positions = load_file(0, 0, args.pattern)
+    load_time = time.perf_counter() - start
+
+    rule = parse_rule(args.rule or load_rule(args.pattern) or LIFE_RULE)
+    backend = backend_for_rule(args.backend, rule)
+    if backend != args.backend:
+        print(f"{args.backend} can't run {rule}, using {backend}", file=sys.stderr)
+    args.backend = backend
+
+    engine = create_engine(args.backend, positions, tuple(map(int, args.size.split("x"))) if args.size else None, rule)
+    detector = CycleDetector() if args.skip_cycles else None
+    elapsed = run(engine, args.generations, args.batch, detector)
+
+    if args.output:
+        save_result(engine, args.backend, rule, args.output)
+
+    peak = peak_memory_mb()
+    print(f"backend: {args.backend}")
+    print(f"rule: {rule}")
+    print(f"load: {load_time:.3f}s")
+    print(f"generations: {args.generations} in {elapsed:.3f}s ({args.generations / elapsed if elapsed else float('inf'):.1f} gen/s)")
+    print(f"population: {engine.population()}")
+    if detector is not None:
+        print(f"cycle: {f'period {detector.period} from generation {detector.start}' if detector.period else 'none found'}")
+    print(f"peak memory: {f'{peak:.1f} MiB' if peak is not None else 'unavailable'}")
+
+if __name__ == "__main__":
+    main()
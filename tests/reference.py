@@ -0,0 +1,31 @@
+import numpy as np
+
+from game.rules import NEIGHBOR_OFFSETS
+
+# Slow, obviously correct stepper the engines are checked against: every cell looks up its whole
+# neighbourhood in the rule table, cells outside of the board are dead.
+def reference_step(cells, rule, generations=1):
+    cells = np.array(cells, dtype=np.uint8)
+    rows, cols = cells.shape
+
+    for _ in range(generations):
+        padded = np.zeros((rows + 2, cols + 2), dtype=np.uint8)
+        padded[1:-1, 1:-1] = cells
+        following = np.empty_like(cells)
+        for row in range(rows):
+            for col in range(cols):
+                neighborhood = int(cells[row, col]) << 8
+                for bit, (dy, dx) in enumerate(NEIGHBOR_OFFSETS):
+                    if padded[row + 1 + dy, col + 1 + dx] == 1:
+                        neighborhood |= 1 << bit
+                following[row, col] = rule.table[neighborhood]
+        cells = following
+
+    return cells
+
+def normalized(positions):
+    # Set of (row, col) moved so the smallest row and column are 0, to compare patterns wherever they are.
+    positions = np.asarray(positions, dtype=np.int64).reshape(-1, 2)
+    if not len(positions):
+        return set()
+    return set(map(tuple, (positions - positions.min(axis=0)).tolist()))
@@ -0,0 +1,16 @@
+from game.cycle_detection import CycleDetector
+from game.hashlife import HashLifeEngine
+
+def test_hashlife_cycle_is_found_across_a_collect():
+    engine = HashLifeEngine(16, 16)
+    engine.load_positions([(8, 7), (8, 8), (8, 9)]) # blinker
+    detector = CycleDetector()
+
+    detector.observe(0, engine.state_key())
+    engine.step(1)
+    assert not detector.observe(1, engine.state_key())
+
+    engine.universe.collect() # drops the nodes of the other phase, it is built again as new ones
+    engine.step(1)
+    assert detector.observe(2, engine.state_key())
+    assert (detector.period, detector.start) == (2, 0)
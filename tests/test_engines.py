@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from game.backends import CPU_BACKENDS, UNBOUNDED_BACKENDS, backend_for_rule
+from game.rules import parse_rule
+from game.soup_search import random_soup
+from game.threaded_engine import ThreadedEngine
+from tests.reference import reference_step, normalized
+
+ROWS, COLS, GENERATIONS = 128, 64, 16
+# Life, HighLife, a Generations rule and an isotropic non-totalistic one
+RULES = ["B3/S23", "B36/S23", "B2/S/C3", "B2-a/S12"]
+
+def soup_board():
+    # far enough from the edges that nothing reaches them, so the unbounded engines see the same board
+    board = np.zeros((ROWS, COLS), dtype=np.uint8)
+    board[56:72, 24:40] = random_soup(7, (16, 16), 0.5)
+    return board
+
+reference_cache = {}
+
+def expected(rule_text):
+    if rule_text not in reference_cache:
+        reference_cache[rule_text] = reference_step(soup_board(), parse_rule(rule_text), GENERATIONS)
+    return reference_cache[rule_text]
+
+def create_engine(backend, board, rule):
+    if backend in UNBOUNDED_BACKENDS:
+        engine = CPU_BACKENDS[backend](ROWS, COLS, rule=rule)
+        engine.load_positions(np.argwhere(board).tolist())
+        return engine
+    if backend == "CPU Threaded": # two bands with a halo between them whatever the core count
+        return ThreadedEngine(ROWS, COLS, board, rule, threads=2)
+    return CPU_BACKENDS[backend](ROWS, COLS, board, rule)
+
+@pytest.mark.parametrize("rule_text", RULES)
+@pytest.mark.parametrize("backend", list(CPU_BACKENDS))
+def test_engine_matches_reference(backend, rule_text):
+    rule = parse_rule(rule_text)
+    if backend_for_rule(backend, rule) != backend:
+        pytest.skip(f"{backend} can't run {rule}")
+
+    engine = create_engine(backend, soup_board(), rule)
+    engine.step(5) # in two calls, whatever an engine keeps between steps has to carry over
+    engine.step(GENERATIONS - 5)
+
+    if backend in UNBOUNDED_BACKENDS:
+        assert normalized(engine.universe.cells()) == normalized(np.argwhere(expected(rule_text) == 1))
+    else:
+        assert np.array_equal(engine.to_cells(), expected(rule_text))
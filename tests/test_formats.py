@@ -0,0 +1,89 @@
+import io
+
+import numpy as np
+import pytest
+
+from game.bitpacked import pack_positions, place_words, unpack
+from game.file_support import read_rle_header, read_rle, load_file, load_rule, save_file, file_type_from_path
+from game.hashlife import HashLife
+from game.macrocell import load_macrocell
+from game.rules import parse_rule
+from game.snapshot import load_snapshot
+from game.soup_search import random_soup
+from tests.reference import normalized
+
+@pytest.fixture
+def cells():
+    # a soup with empty rows and columns around and through it, so blank runs and "$" counts show up
+    cells = np.zeros((60, 90), dtype=np.uint8)
+    cells[5:25, 3:80] = random_soup(1, (20, 77), 0.4)
+    cells[40:55, 10:30] = random_soup(2, (15, 20), 0.6)
+    return cells
+
+@pytest.mark.parametrize("file_name", ["pattern.rle", "pattern.lif", "pattern.06.lif", "pattern.snap", "pattern.mc"])
+def test_round_trip(tmp_path, cells, file_name):
+    path = str(tmp_path / file_name)
+    save_file(cells, path, file_type_from_path(path))
+    assert normalized(load_file(0, 0, path)) == normalized(np.argwhere(cells))
+
+def test_rle_streams_across_chunks(tmp_path, cells):
+    path = tmp_path / "pattern.rle"
+    save_file(cells, str(path), "rle")
+    text = path.read_text()
+
+    _, words, width = read_rle(io.StringIO(text))
+    for chunk_size in (1, 7, 64):
+        _, chunked, chunked_width = read_rle(io.StringIO(text), chunk_size)
+        assert np.array_equal(unpack(chunked, chunked_width), unpack(words, width))
+
+@pytest.mark.parametrize("top, left", [(0, 0), (5, 37), (-3, -50), (20, 70)])
+def test_rle_words_placed_on_the_board(tmp_path, cells, top, left):
+    # cropped at every edge of a 64x100 board, in the 32 bit words the packed shader uses
+    path = tmp_path / "pattern.rle"
+    save_file(cells, str(path), "rle")
+    with open(path) as file:
+        _, words, _ = read_rle(file)
+
+    live = np.argwhere(cells)
+    expected = pack_positions(live - live.min(axis=0) + (top, left), 64, 100, 32) # the file starts at the live cells
+    assert np.array_equal(place_words(words, 64, 100, top, left, 32), expected)
+
+def test_rle_header_undercounting_the_pattern():
+    _, words, width = read_rle(io.StringIO("x = 1, y = 1\n3o$3bo2$100bo!\n"))
+    assert set(map(tuple, np.argwhere(unpack(words, width)).tolist())) == {(0, 0), (0, 1), (0, 2), (1, 3), (3, 100)}
+
+def test_rle_header_rule_runs_to_the_end_of_the_line(tmp_path):
+    header, _ = read_rle_header(io.StringIO("#N glider\nx = 3, y = 3, rule = B3/S23:P10,10\nbo$2bo$3o!\n"))
+    assert header == {"x": 3, "y": 3, "rule": "B3/S23:P10,10"}
+
+    pattern = tmp_path / "bounded.rle"
+    pattern.write_text("x = 1, y = 1, rule = B36/S23:T20,20\no!\n")
+    assert load_rule(str(pattern)) == "B36/S23:T20,20"
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_snapshot_keeps_the_header(tmp_path, cells, compress):
+    path = str(tmp_path / "board.snap")
+    save_file(cells, path, "snapshot", rule="B36/S23", generation=1234, gps=30, compress=compress)
+
+    header, words = load_snapshot(path)
+    assert (header["rows"], header["cols"], header["generation"], header["gps"], header["rule"]) == (60, 90, 1234, 30, "B36/S23")
+    assert np.array_equal(unpack(words, 90), cells)
+    assert load_rule(path) == "B36/S23"
+
+def test_macrocell_keeps_the_universe(tmp_path, cells):
+    universe = HashLife(np.argwhere(cells).tolist())
+    universe.step(50)
+
+    path = str(tmp_path / "universe.mc")
+    save_file(None, path, "macrocell", universe=universe, rule="B3/S23")
+
+    loaded = load_macrocell(path)
+    assert normalized(loaded.cells()) == normalized(universe.cells()) # .mc files keep no origin
+    assert load_rule(path) == "B3/S23"
+
+def test_macrocell_rule_is_left_to_the_caller(tmp_path):
+    # Golly's LifeHistory isn't a rule this game runs, the pattern still loads
+    path = tmp_path / "history.mc"
+    path.write_text("[M2] (golly 4.2)\n#R LifeHistory\n.*$..*$***$\n")
+    assert normalized(load_file(0, 0, str(path))) == normalized([(0, 1), (1, 2), (2, 0), (2, 1), (2, 2)])
+    assert str(load_macrocell(str(path), parse_rule("B36/S23")).rule) == "B36/S23"
@@ -0,0 +1,29 @@
+import subprocess, sys, os
+
+import numpy as np
+import pytest
+
+from game.backends import CPU_BACKENDS
+from game.file_support import load_file, save_file
+from game.rules import LIFE
+from tests.reference import reference_step, normalized
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+R_PENTOMINO = np.array([[0, 1, 1], [1, 1, 0], [0, 1, 0]], dtype=np.uint8)
+GENERATIONS = 40
+
+@pytest.fixture(scope="module")
+def expected():
+    board = np.zeros((80, 80), dtype=np.uint8)
+    board[38:41, 38:41] = R_PENTOMINO
+    return normalized(np.argwhere(reference_step(board, LIFE, GENERATIONS)))
+
+@pytest.mark.parametrize("extension", [".rle", ".lif", ".06.lif", ".snap", ".mc"])
+@pytest.mark.parametrize("backend", list(CPU_BACKENDS))
+def test_backend_output(tmp_path, backend, extension, expected):
+    pattern, output = tmp_path / "pattern.rle", tmp_path / f"result{extension}"
+    save_file(R_PENTOMINO, str(pattern), "rle")
+
+    subprocess.run([sys.executable, "headless.py", str(pattern), str(GENERATIONS), "--backend", backend, "--output", str(output)], cwd=ROOT, check=True, capture_output=True)
+
+    assert normalized(load_file(0, 0, str(output))) == expected
@@ -0,0 +1,9 @@
+import subprocess, sys, os
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_game_modules_leave_out_multiprocessing():
+    # The release build excludes multiprocessing, everything the game view imports has to work without it.
+    modules = "game.soup_search, game.backends, game.file_support, game.rewind, game.cycle_detection, game.edit_queue"
+    code = f"import sys, {modules}; assert 'multiprocessing' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
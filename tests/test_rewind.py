@@ -0,0 +1,49 @@
+import numpy as np
+
+from game.rewind import RewindHistory, state_planes, pack_planes, unpack_planes
+
+def random_board(seed, states=2, shape=(40, 70)):
+    return np.random.default_rng(seed).integers(0, states, shape).astype(np.uint8)
+
+def test_planes_round_trip():
+    for states in (2, 3, 5, 8):
+        cells = random_board(states, states)
+        words = pack_planes(cells, state_planes(states))
+        assert words.dtype == np.uint32 and words.shape == (state_planes(states), 40, 3)
+        assert np.array_equal(unpack_planes(words, 70), cells)
+
+def test_record_and_restore():
+    history = RewindHistory(1 << 20, keyframe_interval=4)
+    boards = {generation: pack_planes(random_board(generation, 3), 2) for generation in range(0, 100, 10)}
+    for generation, board in boards.items():
+        history.record(generation, board)
+
+    assert history.generations() == list(boards)
+    assert history.newest_generation() == 90
+    for generation, board in boards.items():
+        assert np.array_equal(history.restore(generation), board)
+
+    assert history.step(45, -1) == 40
+    assert history.step(40, 1) == 50
+    assert history.step(45, -1, keyframes=True) == 40
+    assert history.step(0, -1) is None
+
+def test_running_from_a_rewound_generation_drops_the_later_ones():
+    history = RewindHistory(1 << 20)
+    for generation in range(10):
+        history.record(generation, pack_planes(random_board(generation), 1))
+
+    board = pack_planes(random_board(100), 1)
+    history.record(4, board)
+    assert history.generations() == [0, 1, 2, 3, 4]
+    assert np.array_equal(history.restore(4), board)
+
+def test_oldest_states_are_evicted_under_the_cap():
+    history = RewindHistory(64 * 1024, keyframe_interval=8)
+    for generation in range(200):
+        history.record(generation, pack_planes(random_board(generation, shape=(256, 256)), 1))
+
+    assert history.size <= 64 * 1024 or len(history.segments) == 1
+    assert history.generations()[-1] == 199
+    assert history.restore(0) is None
+    assert np.array_equal(history.restore(199), pack_planes(random_board(199, shape=(256, 256)), 1))
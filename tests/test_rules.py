@@ -0,0 +1,67 @@
+import pytest
+
+from game.rules import parse_rule, neighborhood_mask, symmetries
+
+def next_state(rule, state, neighbors):
+    # neighbors are indices into NEIGHBOR_OFFSETS (N, NE, E, SE, S, SW, W, NW)
+    return int(rule.table[state * 256 + neighborhood_mask(neighbors)])
+
+@pytest.mark.parametrize("text", ["B3/S23", "b3/s23", "23/3", "B3/S23/C2", " B3 / S23 "])
+def test_life_spellings(text):
+    rule = parse_rule(text)
+    assert str(rule) == "B3/S23"
+    assert (rule.states, rule.totalistic, rule.births_from_nothing) == (2, True, False)
+
+    for count in range(9):
+        neighbors = tuple(range(count))
+        assert next_state(rule, 0, neighbors) == (count == 3)
+        assert next_state(rule, 1, neighbors) == (count in (2, 3))
+
+@pytest.mark.parametrize("text", ["B2/S/C3", "B2/S/G3", "/2/3"])
+def test_generations(text):
+    rule = parse_rule(text)
+    assert str(rule) == "B2/S/C3"
+    assert rule.states == 3
+
+    assert next_state(rule, 0, (0, 4)) == 1 # born on two
+    assert next_state(rule, 1, (0, 4)) == 2 # never survives, starts dying
+    assert next_state(rule, 2, (0, 1, 2)) == 0 # dying cells ignore their neighbours
+
+def test_births_from_nothing():
+    assert parse_rule("B0/S8").births_from_nothing
+    assert not parse_rule("B36/S23").births_from_nothing
+
+def test_hensel():
+    rule = parse_rule("B2-a/S12")
+    assert not rule.totalistic
+
+    assert next_state(rule, 0, (0, 1)) == 0 # 2a, two adjacent neighbours
+    assert next_state(rule, 0, (2, 3)) == 0 # 2a turned
+    assert next_state(rule, 0, (1, 3)) == 1 # 2c
+    assert next_state(rule, 0, (0, 4)) == 1 # 2i
+    assert next_state(rule, 1, (0,)) == 1
+    assert next_state(rule, 1, (0, 1, 2)) == 0
+
+    rule = parse_rule("B3/S2-i34q")
+    assert next_state(rule, 1, (0, 4)) == 0 # 2i
+    assert next_state(rule, 1, (0, 2)) == 1 # 2e
+    assert next_state(rule, 1, (0, 1, 2)) == 1 # 3a
+    assert next_state(rule, 1, (0, 1, 5)) == 1 # 3q, every 3 survives
+    assert next_state(rule, 1, (0, 1, 2, 5)) == 1 # 4q
+    assert next_state(rule, 1, (0, 1, 2, 3)) == 0 # 4a
+
+def test_hensel_classes_are_closed_under_symmetry():
+    # every mask of a rule's neighbourhood class gives the same result
+    rule = parse_rule("B2ce3-jr/S23-a")
+    for mask in range(256):
+        for state in (0, 1):
+            assert {int(rule.table[state * 256 + other]) for other in symmetries(mask)} == {int(rule.table[state * 256 + mask])}
+
+@pytest.mark.parametrize("text", ["B3", "B3/S23/Q4", "B9/S23", "B2z/S23", "B3/S23/C1"])
+def test_bad_rules(text):
+    with pytest.raises(ValueError):
+        parse_rule(text)
+
+def test_grid_suffix_is_dropped():
+    assert str(parse_rule("B3/S23:P10,10")) == "B3/S23"
+    assert str(parse_rule("B2/S/C3:T100,100")) == "B2/S/C3"
@@ -0,0 +1,11 @@
+from game.soup_search import separate, classify
+
+def census(cells):
+    return sorted(classify(group) for group in separate(cells))
+
+def test_nearby_objects_that_dont_interact_stay_separate():
+    assert census([(0, 0), (1, 0), (2, 0), (0, 4), (1, 4), (2, 4)]) == ["xp2_7", "xp2_7"] # blinkers 2 cells apart when horizontal
+    assert census([(0, 0), (0, 1), (1, 0), (1, 1), (0, 3), (0, 4), (1, 3), (1, 4)]) == ["xs4_33", "xs4_33"]
+
+def test_an_object_whose_phase_falls_apart_stays_whole():
+    assert census([(0, 0), (0, 1), (1, 0), (2, 3), (3, 2), (3, 3)]) == ["xp2_318c"] # beacon, two L trominoes in this phase
@@ -34,9 +34,30 @@ settings = {
         "Music Volume": {"type": "slider", "min": 0, "max": 100, "config_key": "music_volume", "default": 50},
         "SFX Volume": {"type": "slider", "min": 0, "max": 100, "config_key": "sfx_volume", "default": 50},
     },
+    "Simulation": {
+        "Rule": {"type": "option", "options": ["B3/S23", "B36/S23", "B3678/S34678", "B2/S", "B1357/S1357", "B3/S012345678", "B2/S/C3", "B2-a/S12", "B3/S2-i34q"], "config_key": "rule", "default": "B3/S23"},
+        "Backend": {"type": "option", "options": ["GPU", "GPU Bit-Packed", "CPU", "CPU Threaded", "CPU Bit-Packed", "HashLife", "Sparse"], "config_key": "backend", "default": "GPU"},
+        "Grid Size": {"type": "option", "options": ["160x90", "320x180", "640x360", "1280x720", "1920x1080", "3840x2160", "7680x4320"], "config_key": "grid_size", "default": "160x90"},
+        "Workgroup Size": {"type": "option", "options": ["16x16", "32x8", "32x32", "8x8", "1x1"], "config_key": "workgroup_size", "default": "16x16"},
+        "Active Tiles": {"type": "bool", "config_key": "active_tiles", "default": True},
+        "Turbo Budget (ms)": {"type": "slider", "min": 1, "max": 30, "config_key": "turbo_budget", "default": 8},
+        "Fit Grid To Pattern": {"type": "bool", "config_key": "fit_grid_to_pattern", "default": True},
+        "Compress Snapshots": {"type": "bool", "config_key": "compress_snapshots", "default": False},
+        "Soup Density (%)": {"type": "slider", "min": 1, "max": 99, "config_key": "soup_density", "default": 50},
+        "On Cycle": {"type": "option", "options": ["Report", "Pause", "Skip Ahead"], "config_key": "cycle_action", "default": "Report"},
+        "Rewind Memory (MB)": {"type": "slider", "min": 0, "max": 1024, "config_key": "rewind_memory", "default": 64},
+        "Rewind Interval": {"type": "slider", "min": 1, "max": 256, "config_key": "rewind_interval", "default": 16},
+    },
+    "Drawing": {
+        "Brush Shape": {"type": "option", "options": ["Square", "Circle"], "config_key": "brush_shape", "default": "Square"},
+        "Brush Size": {"type": "slider", "min": 1, "max": 16, "config_key": "brush_size", "default": 1},
+    },
     "Miscellaneous": {
         "Discord RPC": {"type": "bool", "config_key": "discord_rpc", "default": True},
     },
     "Credits": {}
 }
 settings_start_category = "Graphics"
+
+# Largest board a loaded pattern may grow the grid to, the biggest Grid Size option
+MAX_COLS, MAX_ROWS = map(int, settings["Simulation"]["Grid Size"]["options"][-1].split("x"))